@@ -25,12 +25,26 @@
 ===============================================================================
 '''
 import pyvisa
+import os
+import sys
 import time
-import csv
+import threading
+import queue
+import numpy as np
 import matplotlib.pyplot as plt
 import tkinter as tk
 from tkinter import filedialog
-from datetime import datetime
+
+try:
+    # Make the shared Keithley_6517B helpers importable when run as a standalone script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    k6517b_dir = os.path.abspath(os.path.join(script_dir, os.pardir, os.pardir))
+    if k6517b_dir not in sys.path:
+        sys.path.append(k6517b_dir)
+except Exception:
+    pass # Path manipulation can fail in some environments (e.g., frozen executables)
+
+from K6517B_Reading import parse_keithley_reading
 
 try:
     from pymeasure.instruments.keithley import Keithley6517B
@@ -50,6 +64,16 @@ HEATER_OUTPUT = 1       # Control output loop for the heater (1 or 2)
 HEATER_RESISTANCE_CODE = 1 # 1=25Ω, 2=50Ω
 MAX_HEATER_CURRENT_CODE = 2 # 1=0.707A, 2=1A, 3=1.414A, 4=1.732A
 
+# Sampling
+SAMPLE_INTERVAL = 2.0   # Seconds from the start of one sample to the start of the next
+
+# Live plot
+DRAW_EVERY = 5          # Redraw the plot every Nth sample; every sample is still logged
+
+# Data file
+CSV_HEADER = ("Timestamp,Elapsed Time (s),Temperature (K),Heater Output (%),"
+              "Applied Voltage (V),Measured Current (A),Resistance (Ohm)\r\n")
+
 # --- Instrument Control Classes & Functions ---
 
 class Lakeshore350:
@@ -61,6 +85,12 @@ class Lakeshore350:
             rm = pyvisa.ResourceManager()
             self.instrument = rm.open_resource(visa_address)
             self.instrument.timeout = 10000  # 10 second timeout
+            # Explicit terminators let each read stop at the first CR/LF instead of
+            # waiting on END/timeout; replies are short, so a small chunk suffices.
+            self.instrument.read_termination = '\r\n'
+            self.instrument.write_termination = '\n'
+            self.instrument.query_delay = 0.0
+            self.instrument.chunk_size = 1024
             idn = self.instrument.query('*IDN?').strip()
             print(f"Successfully connected to: {idn}")
         except pyvisa.errors.VisaIOError as e:
@@ -119,6 +149,15 @@ class Lakeshore350:
             print(f"Warning: Could not read heater output {output}. Error: {e}")
             return float('nan')
 
+    def get_temp_and_heater(self, sensor, output):
+        """Reads temperature and heater output with one compound query (one GPIB round trip)."""
+        try:
+            temp_str, output_str = self.instrument.query(f'KRDG? {sensor};HTR? {output}').strip().split(';')
+            return float(temp_str), float(output_str)
+        except (pyvisa.errors.VisaIOError, ValueError) as e:
+            print(f"Warning: Could not read temperature/heater output. Error: {e}")
+            return float('nan'), float('nan')
+
     def close(self):
         if self.instrument:
             print("\n--- Safely shutting down Lakeshore ---")
@@ -180,6 +219,59 @@ def perform_keithley_zero_check(keithley):
     time.sleep(1)
     print("Zero Correction Complete.")
 
+def point_outside_view(ax, x, y):
+    """True if (x, y) lies outside the current limits of `ax` (NaN never does)."""
+    (x0, x1), (y0, y1) = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+    return x < x0 or x > x1 or y < y0 or y > y1
+
+def format_row(timestamp, elapsed, temp, heater, voltage, current, resistance):
+    """
+    Formats one data row. The column layout is fixed, so the row is built directly
+    rather than through csv.writer; the f-string is compiled once with the function
+    instead of a %-format string being parsed on every call.
+    """
+    return f"{timestamp},{elapsed:.2f},{temp:.4f},{heater:.2f},{voltage:.4e},{current:.4e},{resistance:.4e}\r\n"
+
+class CSVLogger:
+    """
+    Keeps the data file open for the whole run. The header is written on open;
+    rows go through a 128 kB block buffer with no per-row flush, and the file is
+    flushed, fsynced and closed exactly once, on close.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+
+    def open(self):
+        self.file = open(self.filename, 'w', newline='', buffering=1 << 17)
+        self.file.write(CSV_HEADER)
+        return self
+
+    def write_row(self, *values):
+        self.file.write(format_row(*values))
+
+    def close(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+
+def csv_writer_loop(row_queue, log, errors):
+    """
+    Writes value tuples taken from `row_queue` to the open `log` until a None
+    sentinel arrives. A failed write is appended to `errors` and ends the thread;
+    the sampling loop checks for it and aborts the run.
+    """
+    try:
+        while True:
+            row = row_queue.get()
+            if row is None:
+                break
+            log.write_row(*row)
+    except Exception as e:
+        errors.append(e)
+
 # --- Main Program Execution ---
 def main():
     """Main function to run the R-T experiment."""
@@ -199,6 +291,10 @@ def main():
 
     lakeshore = None
     keithley = None
+    row_queue = queue.Queue()
+    writer_thread = None
+    data_log = None
+    writer_errors = [] # Filled by the writer thread if a write fails
     try:
         # --- Initialize Instruments ---
         lakeshore = Lakeshore350(LAKESHORE_VISA)
@@ -208,6 +304,8 @@ def main():
         print(f"\nAttempting to connect to Keithley at: {KEITHLEY_VISA}")
         keithley = Keithley6517B(KEITHLEY_VISA)
         print(f"Successfully connected to: {keithley.id}")
+        keithley.adapter.connection.read_termination = '\n'
+        keithley.adapter.connection.chunk_size = 1024
         perform_keithley_zero_check(keithley)
 
         keithley.source_voltage = source_voltage
@@ -219,33 +317,54 @@ def main():
         plt.ion()
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 8))
         fig.suptitle('Live R-T Measurement', fontsize=16)
-        line1, = ax1.plot([], [], 'b-o', markersize=3)
+        line1, = ax1.plot([], [], 'b-o', markersize=3, animated=True)
         ax1.set_xlabel('Elapsed Time (s)')
         ax1.set_ylabel('Temperature (K)')
         ax1.set_title('Temperature Ramp Profile')
         ax1.grid(True, linestyle=':')
-        line2, = ax2.plot([], [], 'r-s', markersize=3)
+        line2, = ax2.plot([], [], 'r-s', markersize=3, animated=True)
         ax2.set_xlabel('Temperature (K)')
         ax2.set_ylabel('Resistance (Ω)')
         ax2.set_title('Resistance vs. Temperature')
         ax2.grid(True, linestyle=':')
         ax2.set_yscale('log')
         fig.tight_layout(rect=[0, 0.03, 1, 0.95])
-        time_data, temp_data, res_data = [], [], []
+        # Preallocated plot buffers sized for the expected ramp (one point per >=2 s,
+        # plus margin); they double if the run goes longer. Only [:n_points] is valid.
+        capacity = int((safety_cutoff - start_temp) / rate * 60 / 2) + 100
+        time_data, temp_data, res_data = np.empty(capacity), np.empty(capacity), np.empty(capacity)
+        n_points = 0
+        needs_rescale = False
+
+        # Blitting: every full draw (first show, resize, rescale) caches the clean
+        # axes backgrounds; regular updates only repaint the two lines.
+        plot_axes = ((ax1, line1), (ax2, line2))
+        backgrounds = {}
+        def on_draw(event):
+            for ax, line in plot_axes:
+                backgrounds[ax] = fig.canvas.copy_from_bbox(ax.bbox)
+                ax.draw_artist(line)
+        fig.canvas.mpl_connect('draw_event', on_draw)
+        fig.canvas.draw()
 
         # --- NEW: Go to Start Temp and Stabilize with Active Control ---
         print(f"\nMoving to start temperature of {start_temp} K using active control...")
+        # The setpoint never changes while stabilizing, so it is written once up front
+        lakeshore.set_setpoint(HEATER_OUTPUT, start_temp)
+        last_range = None  # Heater commands are only sent when the range changes
         while True:
             current_temp = lakeshore.get_temperature(SENSOR_INPUT)
 
             # Active heating/cooling logic
             if current_temp > start_temp + 0.2:  # System is too warm
                 print(f"Cooling... Current: {current_temp:.4f} K > Target: {start_temp} K", end='\r')
-                lakeshore.set_heater_range(HEATER_OUTPUT, 'off')
+                desired_range = 'off'
             else:  # System is too cold or within tolerance
                 print(f"Heating... Current: {current_temp:.4f} K <= Target: {start_temp} K", end='\r')
-                lakeshore.set_heater_range(HEATER_OUTPUT, 'medium')
-                lakeshore.set_setpoint(HEATER_OUTPUT, start_temp)
+                desired_range = 'medium'
+            if desired_range != last_range:
+                lakeshore.set_heater_range(HEATER_OUTPUT, desired_range)
+                last_range = desired_range
 
             # Check for stabilization
             if abs(current_temp - start_temp) < 0.1:  # Stabilization tolerance
@@ -255,6 +374,8 @@ def main():
             time.sleep(2) # Interval for checking stabilization status
 
         # --- Start Ramp and Data Logging ---
+        # Opened (and the header written) here, so a bad path stops the run before the ramp
+        data_log = CSVLogger(filename).open()
         lakeshore.setup_ramp(HEATER_OUTPUT, rate)
         lakeshore.set_setpoint(HEATER_OUTPUT, end_temp)
         lakeshore.set_heater_range(HEATER_OUTPUT, 'medium') # Ensure heater is on for the ramp
@@ -262,22 +383,34 @@ def main():
 
         start_time = time.time()
 
-        with open(filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                "Timestamp", "Elapsed Time (s)", "Temperature (K)", "Heater Output (%)",
-                "Applied Voltage (V)", "Measured Current (A)", "Resistance (Ohm)"
-            ])
+        # Rows are handed to a writer thread so slow disk I/O never stretches
+        # the sampling cadence of this loop.
+        writer_thread = threading.Thread(target=csv_writer_loop, args=(row_queue, data_log, writer_errors), daemon=True)
+        writer_thread.start()
+
+        # Methods used on every sample, resolved once (local lookups in the loop)
+        read_lakeshore = lakeshore.get_temp_and_heater
+        # ':READ?' straight on the VISA session: skips pymeasure's property machinery
+        # and the function reconfiguration that ':MEAS:RES?' performs on every call.
+        query_keithley = keithley.adapter.connection.query
+        clock, monotonic, sleep = time.time, time.monotonic, time.sleep
+        localtime, strftime = time.localtime, time.strftime
+        enqueue_row = row_queue.put
+        writer_alive = writer_thread.is_alive
+        canvas = fig.canvas
 
         # --- Main experiment loop ---
         while True:
-            elapsed_time = time.time() - start_time
-            current_temp = lakeshore.get_temperature(SENSOR_INPUT)
-            heater_output = lakeshore.get_heater_output(HEATER_OUTPUT)
+            # Fixed cadence: the settling delay and bus time count towards the interval
+            deadline = monotonic() + SAMPLE_INTERVAL
+            now = clock()
+            elapsed_time = now - start_time
+            current_temp, heater_output = read_lakeshore(SENSOR_INPUT, HEATER_OUTPUT)
 
-            time.sleep(delay)
-            resistance = keithley.resistance
-            current = abs(source_voltage / resistance) if resistance != 0 else float('inf')
+            sleep(delay)
+            resistance = parse_keithley_reading(query_keithley(':READ?'))
+            # Signed like the applied voltage; the row format carries the sign
+            current = source_voltage / resistance if resistance else float('inf')
 
             status_str = (
                 f"Time: {elapsed_time:7.2f}s | "
@@ -286,23 +419,40 @@ def main():
             )
             print(status_str, end='\r')
 
-            with open(filename, 'a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    f"{elapsed_time:.2f}", f"{current_temp:.4f}", f"{heater_output:.2f}",
-                    f"{source_voltage:.4e}", f"{current:.4e}", f"{resistance:.4e}"
-                ])
-
-            time_data.append(elapsed_time)
-            temp_data.append(current_temp)
-            res_data.append(resistance)
-
-            line1.set_data(time_data, temp_data)
-            ax1.relim(); ax1.autoscale_view()
-            line2.set_data(temp_data, res_data)
-            ax2.relim(); ax2.autoscale_view()
-            fig.canvas.draw(); fig.canvas.flush_events()
+            if writer_errors or not writer_alive():
+                raise RuntimeError(f"Writing to '{filename}' failed: {writer_errors[0] if writer_errors else 'writer thread stopped'}")
+            enqueue_row((
+                strftime('%Y-%m-%d %H:%M:%S', localtime(now)),
+                elapsed_time, current_temp, heater_output,
+                source_voltage, current, resistance
+            ))
+
+            if n_points == len(time_data):
+                time_data, temp_data, res_data = (np.resize(a, 2 * len(a)) for a in (time_data, temp_data, res_data))
+            time_data[n_points] = elapsed_time
+            temp_data[n_points] = current_temp
+            res_data[n_points] = resistance
+            n_points += 1
+
+            # Rescale (full redraw) only when a point has fallen outside the current view
+            needs_rescale = needs_rescale or any(point_outside_view(ax, x, y) for ax, x, y in
+                                                 ((ax1, elapsed_time, current_temp), (ax2, current_temp, resistance)))
+            if n_points % DRAW_EVERY == 0:
+                # Float64 views of the buffers; Matplotlib keeps them without copying
+                temp_view = temp_data[:n_points]
+                line1.set_xdata(time_data[:n_points]); line1.set_ydata(temp_view)
+                line2.set_xdata(temp_view); line2.set_ydata(res_data[:n_points])
+                if needs_rescale:
+                    for ax, _ in plot_axes:
+                        ax.relim(); ax.autoscale_view()
+                    canvas.draw()
+                    needs_rescale = False
+                else:
+                    for ax, line in plot_axes:
+                        canvas.restore_region(backgrounds[ax])
+                        ax.draw_artist(line)
+                        canvas.blit(ax.bbox)
+            canvas.flush_events()
 
             # --- Check for End Conditions ---
             if current_temp >= safety_cutoff:
@@ -313,7 +463,14 @@ def main():
                 break
             
             # The main data logging interval. Should be independent of Keithley delay.
-            time.sleep(2)
+            sleep(max(0.0, deadline - monotonic()))
+
+        # Show the samples taken since the last periodic redraw in the final plot
+        temp_view = temp_data[:n_points]
+        line1.set_xdata(time_data[:n_points]); line1.set_ydata(temp_view)
+        line2.set_xdata(temp_view); line2.set_ydata(res_data[:n_points])
+        for ax, _ in plot_axes:
+            ax.relim(); ax.autoscale_view()
 
     except ConnectionError as e:
         print(f"\nCould not start experiment due to a connection failure: {e}")
@@ -323,15 +480,31 @@ def main():
         print(f"\n\nAn unexpected error occurred: {e}")
     finally:
         # --- Guaranteed Safe Shutdown ---
+        # Source and heater go off first; flushing the data file can wait
         print("\n--- Initiating Safe Shutdown of All Instruments ---")
-        if keithley:
-            keithley.shutdown()
-            print("Keithley voltage source is OFF and connection is closed.")
-        if lakeshore:
-            lakeshore.close()
+        try:
+            if keithley:
+                keithley.shutdown()
+                print("Keithley voltage source is OFF and connection is closed.")
+            if lakeshore:
+                lakeshore.close()
+        finally:
+            if writer_thread:
+                row_queue.put(None) # Sentinel: write out what is queued
+                writer_thread.join()
+            if data_log:
+                try:
+                    data_log.close()
+                except OSError as e:
+                    writer_errors.append(e)
 
         plt.ioff()
-        print(f"\nExperiment finished. Data saved to '{filename}'.")
+        if writer_errors:
+            print(f"\nExperiment finished, but the data file '{filename}' is incomplete: {writer_errors[0]}")
+        elif data_log:
+            print(f"\nExperiment finished. Data saved to '{filename}'.")
+        else:
+            print("\nExperiment finished. No data was recorded.")
         print("Plot window can now be closed.")
         plt.show()
 
@@ -21,12 +21,25 @@
 ===============================================================================
 '''
 
+import os
+import sys
 import time
 import csv
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+try:
+    # Make the shared Keithley_6517B helpers importable when run as a standalone script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    k6517b_dir = os.path.abspath(os.path.join(script_dir, os.pardir, os.pardir))
+    if k6517b_dir not in sys.path:
+        sys.path.append(k6517b_dir)
+except Exception:
+    pass # Path manipulation can fail in some environments (e.g., frozen executables)
+
+from K6517B_Reading import KeithleyReadError, parse_keithley_reading
+
 try:
     from pymeasure.instruments.keithley import Keithley6517B
     from pyvisa.errors import VisaIOError
@@ -38,6 +51,8 @@ except ImportError:
 # --- 1. USER CONFIGURATION ---
 # The VISA address is fixed as it was in V5.
 VISA_ADDRESS = "GPIB1::27::INSTR"
+# Data rows have a fixed layout and are written without csv.writer (CRLF as csv uses)
+ROW_FMT = "%.3f,%.4e,%.4e,%.4e\r\n"
 
 def get_sweep_parameters():
     """Gets I-V sweep parameters from the user."""
@@ -53,13 +68,12 @@ def get_sweep_parameters():
     return start_v, stop_v, steps, delay, filename
 
 def plot_results(data):
-    """Plots the I-V curve from the collected data."""
+    """Plots the I-V curve from the collected (voltage, current) pairs."""
     if not data:
         print("\nNo data to plot.")
         return
 
-    voltages = [float(row[1]) for row in data]
-    currents = [float(row[2]) for row in data]
+    voltages, currents = zip(*data)
 
     plt.figure(figsize=(8, 6))
     plt.plot(voltages, currents, 'o-', label='I-V Data', color='#003f5c')
@@ -112,30 +126,40 @@ try:
 
     # --- 5. SETUP AND PERFORM I-V SWEEP ---
     print(f"\nStarting I-V sweep from {start_v}V to {stop_v}V...")
+    # Read current directly (the sweep's actual quantity) and derive R = V/I,
+    # instead of reading the instrument's computed resistance and dividing back.
+    keithley.measure_current()
     keithley.current_nplc = 1 # Set integration rate for noise reduction
 
     keithley.enable_source()
 
-    with open(filename, 'w', newline='') as f:
+    with open(filename, 'w', newline='', buffering=1 << 16) as f:
         writer = csv.writer(f)
         writer.writerow([f"# Measurement Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
         writer.writerow([f"# Sweep Parameters: Start={start_v}V, Stop={stop_v}V, Steps={steps}, Delay={delay}s"])
         writer.writerow(["Timestamp (s)", "Applied Voltage (V)", "Measured Current (A)", "Resistance (Ohm)"])
 
-        start_time = time.time()
-        for i, voltage in enumerate(voltage_sweep):
-            keithley.source_voltage = voltage
-            time.sleep(delay)
-            resistance = keithley.resistance
-            timestamp = time.time() - start_time
-            #resistance = keithley.resistance
-            current = voltage/resistance if resistance != 0 else float('inf')
-
-            print(f"Step {i+1}/{steps}: V={voltage:.3f} V, I={current:.4e} A, R={resistance:.4e} Ω")
-
-            data_point = [f"{timestamp:.3f}", f"{voltage:.4e}", f"{current:.4e}", f"{resistance:.4e}"]
-            results.append(data_point)
-            writer.writerow(data_point)
+        # Rows are kept in memory and written in one call once the sweep ends
+        # (also if it is interrupted, so completed points are never lost).
+        rows = []
+        # ':READ?' straight on the VISA session: skips pymeasure's property machinery
+        # and the function reconfiguration that ':MEAS:CURR?' performs on every call.
+        query_keithley = keithley.adapter.connection.query
+        try:
+            start_time = time.time()
+            for i, voltage in enumerate(voltage_sweep):
+                keithley.source_voltage = voltage
+                time.sleep(delay)
+                current = parse_keithley_reading(query_keithley(':READ?'))
+                timestamp = time.time() - start_time
+                resistance = voltage/current if current != 0 else float('inf')
+
+                print(f"Step {i+1}/{steps}: V={voltage:.3f} V, I={current:.4e} A, R={resistance:.4e} Ω")
+
+                rows.append(ROW_FMT % (timestamp, voltage, current, resistance))
+                results.append((voltage, current))
+        finally:
+            f.write(''.join(rows))
 
     print("\n--- I-V Sweep Complete ---")
     print(f"Data saved successfully to '{filename}'")
@@ -144,6 +168,10 @@ except VisaIOError:
     print(f"\n[VISA Connection Error]")
     print(f"Could not connect to the instrument at '{VISA_ADDRESS}'.")
     print("Please check the address, cable connections, and if the instrument is on.")
+except KeithleyReadError as e:
+    # Must precede the ValueError branch: a bad reply is not a bad sweep parameter
+    print(f"\n[Instrument Read Error] {e}")
+    print("The sweep was aborted; points measured before the failed reading were saved.")
 except ValueError:
     print("\n[Input Error] Please enter valid numbers for the sweep parameters.")
 except Exception as e:
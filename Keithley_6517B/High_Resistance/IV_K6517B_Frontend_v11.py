@@ -13,8 +13,13 @@ import tkinter as tk
 from tkinter import ttk, Label, Entry, LabelFrame, Button, filedialog, messagebox, scrolledtext, Canvas
 import threading, queue
 import numpy as np
+import atexit
 import csv
 import os
+import importlib.util
+import re
+import sys
+import subprocess
 import time
 import traceback
 from datetime import datetime
@@ -24,6 +29,17 @@ import matplotlib as mpl
 import runpy
 from multiprocessing import Process
 
+try:
+    # Make the shared Keithley_6517B helpers importable when run as a standalone script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    k6517b_dir = os.path.abspath(os.path.join(script_dir, os.pardir))
+    if k6517b_dir not in sys.path:
+        sys.path.append(k6517b_dir)
+except Exception:
+    pass # Path manipulation can fail in some environments (e.g., frozen executables)
+
+from K6517B_Reading import parse_keithley_reading
+
 # --- Pillow for Logo Image ---
 try:
     from PIL import Image, ImageTk
@@ -33,20 +49,24 @@ except ImportError:
     PIL_AVAILABLE = False
 
 # --- Packages for Back end ---
+# PyMeasure is slow to import and only needed once a sweep connects, so it is
+# just located here and imported in Keithley6517B_Backend.initialize_instruments.
 try:
     import pyvisa
-    from pymeasure.instruments.keithley import Keithley6517B
     from pyvisa.errors import VisaIOError
-    PYMEASURE_AVAILABLE = True
+    PYMEASURE_AVAILABLE = importlib.util.find_spec("pymeasure") is not None
 
 except ImportError:
     pyvisa = None
-    Keithley6517B = None
     VisaIOError = None
     PYMEASURE_AVAILABLE = False
 
+# Worker -> GUI queue items are tuples tagged with one of these opcodes:
+# (MSG_DATA, res, cur, volt, t), (MSG_DONE,), (MSG_ERROR, exc)
+MSG_DATA, MSG_DONE, MSG_ERROR = range(3)
 
-def run_script_process(script_path):
+
+def _run_script(script_path):
     """
     Wrapper function to execute a script using runpy in its own directory.
     This becomes the target for the new, isolated process.
@@ -59,6 +79,18 @@ def run_script_process(script_path):
         print(e)
         print("-------------------------")
 
+def run_script_process(script_path):
+    """
+    Starts a standalone script in a new process, in its own directory. From source
+    it gets a fresh interpreter, so nothing is pickled and this module is not
+    re-imported. In a frozen build sys.executable is the GUI executable itself,
+    so the bundled script is run through runpy in a multiprocessing child instead.
+    """
+    if getattr(sys, 'frozen', False):
+        Process(target=_run_script, args=(script_path,)).start()
+    else:
+        subprocess.Popen([sys.executable, script_path], cwd=os.path.dirname(script_path))
+
 def launch_plotter_utility():
     """Finds and launches the plotter utility script in a new process."""
     try:
@@ -68,7 +100,7 @@ def launch_plotter_utility():
         if not os.path.exists(plotter_path):
             messagebox.showerror("File Not Found", f"Plotter utility not found at expected path:\n{plotter_path}")
             return
-        Process(target=run_script_process, args=(plotter_path,)).start()
+        run_script_process(plotter_path)
     except Exception as e:
         messagebox.showerror("Launch Error", f"Failed to launch Plotter Utility: {e}")
 
@@ -81,7 +113,7 @@ def launch_gpib_scanner():
         if not os.path.exists(scanner_path):
             messagebox.showerror("File Not Found", f"GPIB Scanner not found at expected path:\n{scanner_path}")
             return
-        Process(target=run_script_process, args=(scanner_path,)).start()
+        run_script_process(scanner_path)
     except Exception as e:
         messagebox.showerror("Launch Error", f"Failed to launch GPIB Scanner: {e}")
 # -------------------------------------------------------------------------------
@@ -96,6 +128,9 @@ class Keithley6517B_Backend:
     def __init__(self):
         self.keithley = None
         self.is_connected = False
+        self.last_voltage = 0.0 # Last commanded source level, reported with each reading
+        self.display_disabled = False
+        self.source_enabled = False
         if not PYMEASURE_AVAILABLE:
             raise ImportError("PyMeasure or PyVISA is not installed. Please run 'pip install pymeasure'.")
 
@@ -106,42 +141,58 @@ class Keithley6517B_Backend:
         """
         print(f"\n--- [Backend] Initializing Instrument at {parameters['keithley_visa']} ---")
         try:
+            from pymeasure.instruments.keithley import Keithley6517B
             self.keithley = Keithley6517B(parameters['keithley_visa'], timeout=20000)
+            # Explicit termination so each reply completes in a single read, with no query delay
+            connection = self.keithley.adapter.connection
+            connection.read_termination = '\n'
+            connection.write_termination = '\n'
+            connection.query_delay = 0.0
+            connection.chunk_size = 1024
             print(f"  Successfully connected to: {self.keithley.id}")
 
             # --- Configure Measurement and Perform Zero Correction (V5 Core Logic) ---
             print("  Configuring instrument and performing zero correction...")
             self.keithley.reset()
+            self.source_enabled = False # *RST turns the source output off
             # Set the function to resistance to ensure the ammeter is configured for zero correction.
             self.keithley.measure_resistance()
 
             # --- Perform Zero Correction Sequence ---
+            # *OPC? returns once the preceding command has been processed, so each step
+            # waits exactly as long as the instrument needs instead of a fixed sleep.
             print("  Starting zero correction procedure...")
-            time.sleep(1) # Reduced wait time for GUI responsiveness
 
             # 1. Enable Zero Check
             print("    Step 1/4: Enabling Zero Check mode...")
             self.keithley.write(':SYSTem:ZCHeck ON')
-            time.sleep(2)
+            self.keithley.ask('*OPC?')
+            time.sleep(1) # Let the shorted input settle before acquiring the offset
 
             # 2. Acquire the zero measurement
             print("    Step 2/4: Acquiring zero correction value...")
             self.keithley.write(':SYSTem:ZCORrect:ACQuire')
-            time.sleep(2) # Allow time for acquisition
+            self.keithley.ask('*OPC?')
 
             # 3. Disable Zero Check
             print("    Step 3/4: Disabling Zero Check mode...")
             self.keithley.write(':SYSTem:ZCHeck OFF')
-            time.sleep(1)
+            self.keithley.ask('*OPC?')
 
             # 4. Enable Zero Correct
             print("    Step 4/4: Enabling Zero Correction for all measurements.")
             self.keithley.write(':SYSTem:ZCORrect ON')
-            time.sleep(1)
+            self.keithley.ask('*OPC?')
             print("  Zero Correction Complete.")
 
             # Set integration rate for noise reduction (as per V5 core script)
             self.keithley.current_nplc = 1
+            # Return only the reading itself (no timestamp or reading number) from ':READ?'
+            self.keithley.write(':FORMat:ELEMents READing')
+            if parameters.get('display_off'):
+                # Front-panel updates take instrument time on every reading; restored on close
+                self.keithley.write(':DISPlay:ENABle OFF')
+                self.display_disabled = True
 
             self.is_connected = True
             print("--- [Backend] Instrument Initialized and Ready ---")
@@ -157,8 +208,15 @@ class Keithley6517B_Backend:
         """Sets the voltage source level and enables the output."""
         if not self.is_connected:
             raise ConnectionError("Instrument not connected.")
-        self.keithley.source_voltage = voltage
-        self.keithley.enable_source()
+        if not -1000 <= voltage <= 1000:
+            raise ValueError(f"Source voltage {voltage} V is outside the 6517B's ±1000 V range.")
+        # Direct SCPI write: the source_voltage property re-validates and re-formats through
+        # PyMeasure on every step, and the output only needs switching on once per sweep
+        self.keithley.write(':SOURce:VOLTage %g' % voltage)
+        if not self.source_enabled:
+            self.keithley.enable_source()
+            self.source_enabled = True
+        self.last_voltage = voltage
 
     def get_measurement(self):
         """
@@ -167,11 +225,16 @@ class Keithley6517B_Backend:
         if not self.is_connected:
             raise ConnectionError("Instrument not connected.")
 
-        # Read voltage and current from the instrument
-        voltage = self.keithley.source_voltage # Read back the actual source voltage
-        resistance = self.keithley.resistance
+        # The source level was just commanded in set_voltage, so reuse it rather
+        # than spending a second bus round-trip reading it back
+        voltage = self.last_voltage
+        # One ':READ?' transaction on the resistance function set up during initialisation;
+        # the 'resistance' property sends ':MEAS:RES?', which reconfigures the function every call
+        resistance = parse_keithley_reading(self.keithley.ask(':READ?'))
+        # Over-range is reported as 9.9E37; keep it out of the data and plot bounds as inf
+        if abs(resistance) >= 9.9e37: resistance = float('inf')
 
-        # Calculate resistance as done in the command-line script
+        # Calculate current as done in the command-line script
         current = voltage / resistance if resistance != 0 else float('inf')
 
         return resistance, current, voltage
@@ -181,6 +244,9 @@ class Keithley6517B_Backend:
         print("--- [Backend] Closing instrument connection. ---")
         if self.keithley:
             try:
+                if self.display_disabled:
+                    self.keithley.write(':DISPlay:ENABle ON')
+                    self.display_disabled = False
                 print("  Shutting down voltage source...")
                 self.keithley.shutdown()
                 print("  Voltage source OFF. Instrument is safe.")
@@ -188,6 +254,7 @@ class Keithley6517B_Backend:
                 print(f"  Warning: Could not gracefully shut down instrument. Error: {e}")
             finally:
                 self.is_connected = False
+                self.source_enabled = False
                 self.keithley = None
 
 # -------------------------------------------------------------------------------
@@ -220,6 +287,12 @@ class HighResistanceIV_GUI:
     FONT_SUB_LABEL = ('Segoe UI', FONT_SIZE_BASE - 2)
     FONT_TITLE = ('Segoe UI', FONT_SIZE_BASE + 2, 'bold')
     FONT_CONSOLE = ('Consolas', 10)
+    # Usual GPIB addresses of the 6517B; matched on the primary address field only
+    KEITHLEY_ADDR_RE = re.compile(r'GPIB\d*::(25|26|27)::', re.IGNORECASE)
+    CONSOLE_MAX_LINES = 2000
+    FLUSH_EVERY_N_ROWS = 10 # Rows buffered before the data file is flushed to the OS
+    # Same columns and CRLF line ending csv.writer produced, formatted in one step
+    DATA_ROW_FORMAT = "%.3f,%.4e,%.4e,%.4e\r\n"
 
     def __init__(self, root):
         self.root = root
@@ -230,6 +303,9 @@ class HighResistanceIV_GUI:
 
         self.is_running = False
         self.start_time = None
+        self.last_log_sec, self.last_log_stamp = None, "" # Cached console timestamp
+        self.log_buffer = [] # Console lines waiting for the next idle flush
+        self.log_flush_pending = False
         self.logo_image = None # Attribute to hold the logo image reference
         try:
             self.backend = Keithley6517B_Backend()
@@ -237,14 +313,34 @@ class HighResistanceIV_GUI:
             messagebox.showerror("Backend Error", f"Could not initialize the backend.\nError: {e}\n\nPlease ensure PyMeasure and NI-VISA are installed correctly.")
             self.backend = None
         self.file_location_path = ""
-        self.data_storage = {'time': [], 'voltage_applied': [], 'current_measured': [], 'resistance': []}
+        self.rm = None # VISA resource manager, created on the first scan and reused
+        self.display_off_var = tk.BooleanVar(value=False)
+        # Preallocated per sweep (the step count is known up front); data_count is the write index
+        self.data_storage = {key: np.empty(0) for key in ('time', 'voltage_applied', 'current_measured', 'resistance')}
+        self.data_count = 0
+        self.plotted_count = 0 # Points already handed to the plot lines
+        # Running data bounds per quantity and the padded limits currently applied to the axes
+        self.plot_bounds = {key: [np.inf, -np.inf] for key in ('v', 'i', 'r')}
+        self.shown_limits = {}
         self.voltage_list = []
         self.data_queue = queue.Queue()
+        self.data_file = None # Kept open for the whole sweep
+        self.rows_since_flush = 0
+        atexit.register(self._close_data_file, from_atexit=True) # Last-chance flush if the process exits mid-sweep
         self.measurement_thread = None
-        self.plot_backgrounds = None # For blitting
+        self.poll_interval_ms = 200
+        self.stop_event = threading.Event() # Wakes the worker out of its settle wait on stop
+        self.exit_after_stop = False # Set by _on_closing: destroy the window once the stop completes
+        self.plot_backgrounds = None # For blitting: {'iv': ..., 'rv': ...}
+        self._resize_job = None # Pending debounced background recapture
+        self.plot_width_px = 800 # Axes width used to decimate long sweeps to screen resolution
+        self._hidden = False # True while the main window is iconified
         self.setup_styles()
         self.create_widgets()
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+        # Skip plot redraws while minimised; data and file writes carry on
+        self.root.bind('<Unmap>', self._on_root_unmap)
+        self.root.bind('<Map>', self._on_root_map)
 
     def setup_styles(self):
         """Configures ttk styles and Matplotlib for a modern look."""
@@ -262,6 +358,8 @@ class HighResistanceIV_GUI:
         style.map('Start.TButton', background=[('active', '#8AB845'), ('hover', '#8AB845')])
         style.configure('Stop.TButton', background=self.CLR_ACCENT_RED, foreground=self.CLR_FG_LIGHT)
         style.map('Stop.TButton', background=[('active', '#D63C2A'), ('hover', '#D63C2A')])
+        style.configure('Panel.TCheckbutton', background=self.CLR_BG_DARK, foreground=self.CLR_FG_LIGHT, font=self.FONT_BASE)
+        style.map('Panel.TCheckbutton', background=[('active', self.CLR_BG_DARK)], indicatorcolor=[('selected', self.CLR_ACCENT_GREEN)])
         mpl.rcParams['font.family'] = 'Segoe UI'
         mpl.rcParams['font.size'] = self.FONT_SIZE_BASE
         mpl.rcParams['axes.titlesize'] = self.FONT_SIZE_BASE + 4
@@ -310,19 +408,7 @@ class HighResistanceIV_GUI:
         logo_canvas = Canvas(frame, width=self.LOGO_SIZE, height=self.LOGO_SIZE, bg=self.CLR_BG_DARK, highlightthickness=0)
         logo_canvas.grid(row=0, column=0, rowspan=3, padx=15, pady=10)
 
-        if PIL_AVAILABLE and os.path.exists(self.LOGO_FILE_PATH):
-            try:
-                img = Image.open(self.LOGO_FILE_PATH)
-                img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.LANCZOS)
-                # IMPORTANT: Keep a reference to the image to prevent it from being garbage collected
-                self.logo_image = ImageTk.PhotoImage(img)
-                logo_canvas.create_image(self.LOGO_SIZE/2, self.LOGO_SIZE/2, image=self.logo_image)
-            except Exception as e:
-                self.log(f"ERROR: Failed to load logo. {e}")
-                logo_canvas.create_text(self.LOGO_SIZE/2, self.LOGO_SIZE/2, text="LOGO\nERROR", font=self.FONT_BASE, fill=self.CLR_FG_LIGHT, justify='center')
-        else:
-            self.log(f"Warning: Logo not found at '{self.LOGO_FILE_PATH}'")
-            logo_canvas.create_text(self.LOGO_SIZE/2, self.LOGO_SIZE/2, text="LOGO\nMISSING", font=self.FONT_BASE, fill=self.CLR_FG_LIGHT, justify='center')
+        self.root.after(50, lambda: self._load_logo(logo_canvas))
 
         institute_font = ('Segoe UI', self.FONT_SIZE_BASE + 1, 'bold')
         ttk.Label(frame, text="UGC-DAE Consortium for Scientific Research", font=institute_font, background=self.CLR_BG_DARK).grid(row=0, column=1, padx=10, pady=(10,0), sticky='sw')
@@ -336,6 +422,32 @@ class HighResistanceIV_GUI:
         ttk.Label(frame, text=details_text, justify='left').grid(row=3, column=0, columnspan=2, padx=15, pady=(0, 10), sticky='w')
 
 
+    def _load_logo(self, canvas):
+        """Loads the logo image after the main window is drawn."""
+        if PIL_AVAILABLE and os.path.exists(self.LOGO_FILE_PATH):
+            try:
+                # The resized logo is cached as a PNG next to the source so later
+                # launches skip the JPEG decode and LANCZOS resample.
+                cache_path = f"{self.LOGO_FILE_PATH}.{self.LOGO_SIZE}px.cache.png"
+                if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.LOGO_FILE_PATH):
+                    img = Image.open(cache_path)
+                else:
+                    img = Image.open(self.LOGO_FILE_PATH)
+                    img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.LANCZOS)
+                    try:
+                        img.save(cache_path, 'PNG')
+                    except OSError:
+                        pass # Read-only install; just rebuild next time
+                # IMPORTANT: Keep a reference to the image to prevent it from being garbage collected
+                self.logo_image = ImageTk.PhotoImage(img)
+                canvas.create_image(self.LOGO_SIZE/2, self.LOGO_SIZE/2, image=self.logo_image)
+            except Exception as e:
+                self.log(f"ERROR: Failed to load logo. {e}")
+                canvas.create_text(self.LOGO_SIZE/2, self.LOGO_SIZE/2, text="LOGO\nERROR", font=self.FONT_BASE, fill=self.CLR_FG_LIGHT, justify='center')
+        else:
+            self.log(f"Warning: Logo not found at '{self.LOGO_FILE_PATH}'")
+            canvas.create_text(self.LOGO_SIZE/2, self.LOGO_SIZE/2, text="LOGO\nMISSING", font=self.FONT_BASE, fill=self.CLR_FG_LIGHT, justify='center')
+
     def create_input_frame(self, parent):
         frame = LabelFrame(parent, text='Experiment Parameters', relief='groove', bg=self.CLR_BG_DARK, fg=self.CLR_FG_LIGHT, font=self.FONT_TITLE)
         frame.pack(pady=10, padx=10, fill='x')
@@ -375,10 +487,13 @@ class HighResistanceIV_GUI:
         self.file_location_button = ttk.Button(frame, text="Browse Save Location...", command=self._browse_file_location)
         self.file_location_button.grid(row=7, column=0, columnspan=4, padx=10, pady=5, sticky='ew')
 
+        ttk.Checkbutton(frame, text="Fast mode (front-panel display off during sweep)", variable=self.display_off_var,
+                        style='Panel.TCheckbutton').grid(row=8, column=0, columnspan=4, padx=10, pady=(5, 0), sticky='w')
+
         self.start_button = ttk.Button(frame, text="Start Sweep", command=self.start_measurement, style='Start.TButton')
-        self.start_button.grid(row=8, column=0, columnspan=2, padx=10, pady=15, sticky='ew')
+        self.start_button.grid(row=9, column=0, columnspan=2, padx=10, pady=15, sticky='ew')
         self.stop_button = ttk.Button(frame, text="Stop", command=self.stop_measurement, style='Stop.TButton', state='disabled')
-        self.stop_button.grid(row=8, column=2, columnspan=2, padx=10, pady=15, sticky='ew')
+        self.stop_button.grid(row=9, column=2, columnspan=2, padx=10, pady=15, sticky='ew')
 
     def create_console_frame(self, parent):
         frame = LabelFrame(parent, text='Console Output', relief='groove', bg=self.CLR_BG_DARK, fg=self.CLR_FG_LIGHT, font=self.FONT_TITLE)
@@ -419,12 +534,52 @@ class HighResistanceIV_GUI:
 
         self.figure.tight_layout(pad=3.0)
         self.canvas = FigureCanvasTkAgg(self.figure, graph_container)
+        # Cached blit backgrounds only go stale when the canvas changes size
+        self.canvas.mpl_connect('resize_event', self._on_canvas_resize)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+    def _on_canvas_resize(self, event):
+        # Resize events arrive in bursts while the window is dragged; rebuild once it settles
+        if self._resize_job: self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(100, self._recapture_after_resize)
+
+    def _recapture_after_resize(self):
+        self._resize_job = None
+        self.figure.tight_layout(pad=3.0)
+        if self.plot_backgrounds and not self._hidden:
+            self._capture_plot_backgrounds()
+            self._update_plots(self.plotted_count) # Put the lines back over the fresh background
+        else:
+            self.canvas.draw_idle()
+
+    def _capture_plot_backgrounds(self):
+        """Full redraw without the animated lines, then cache each axes for blitting."""
+        self.canvas.draw()
+        self.plot_backgrounds = {'iv': self.canvas.copy_from_bbox(self.ax_iv.bbox),
+                                 'rv': self.canvas.copy_from_bbox(self.ax_rv.bbox)}
+        self.plot_width_px = max(1, int(self.ax_iv.bbox.width))
+
     def log(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        # Several lines are logged per sweep point; only re-format the stamp when the second changes
+        now = int(time.time())
+        if now != self.last_log_sec:
+            self.last_log_sec, self.last_log_stamp = now, time.strftime("%H:%M:%S", time.localtime(now))
+        # Lines logged within one Tk tick are inserted together once the GUI goes idle
+        self.log_buffer.append(f"[{self.last_log_stamp}] {message}\n")
+        if not self.log_flush_pending:
+            self.log_flush_pending = True
+            self.root.after_idle(self._flush_log)
+
+    def _flush_log(self):
+        self.log_flush_pending = False
+        if not self.log_buffer: return
+        text, self.log_buffer = ''.join(self.log_buffer), []
         self.console_widget.config(state='normal')
-        self.console_widget.insert('end', f"[{timestamp}] {message}\n")
+        self.console_widget.insert('end', text)
+        # Keep only the newest lines so inserts do not slow down over a long sweep
+        lines = int(self.console_widget.index('end-1c').split('.')[0]) - 1 # Text ends with a newline
+        if lines > self.CONSOLE_MAX_LINES:
+            self.console_widget.delete('1.0', f'{lines - self.CONSOLE_MAX_LINES + 1}.0')
         self.console_widget.see('end')
         self.console_widget.config(state='disabled')
 
@@ -440,13 +595,15 @@ class HighResistanceIV_GUI:
             steps = int(self.entries["Steps"].get())
             self.delay_ms = int(float(self.entries["Delay (s)"].get()) * 1000)
             params['keithley_visa'] = self.keithley_combobox.get()
+            params['display_off'] = self.display_off_var.get()
 
             if not all([params['sample_name'], params['keithley_visa']]) or not self.file_location_path:
                 raise ValueError("All fields, VISA address, and a save location are required.")
             if steps < 2: raise ValueError("Number of steps must be 2 or more.")
 
-            self.voltage_list = np.linspace(start_v, stop_v, steps)
-            self.log(f"Generated voltage sweep from {start_v}V to {stop_v}V in {steps} steps.")
+            # Plain floats, so PyMeasure formats each SCPI command without np.float64 overhead
+            self.voltage_list = np.linspace(start_v, stop_v, steps).tolist()
+            self.log(f"Generated voltage sweep from {start_v}V to {stop_v}V in {steps} steps, {self.delay_ms}ms settle per step.")
 
             self.backend.initialize_instruments(params)
             self.log(f"Backend initialized for sample: {params['sample_name']}")
@@ -455,142 +612,285 @@ class HighResistanceIV_GUI:
             file_name = f"{params['sample_name']}_{timestamp}_IV.dat"
             self.data_filepath = os.path.join(self.file_location_path, file_name)
 
-            with open(self.data_filepath, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([f"# Sample Name: {params['sample_name']}"])
-                writer.writerow([f"# Voltage Sweep: {start_v}V to {stop_v}V, {steps} steps, {self.delay_ms/1000}s delay"])
-                writer.writerow(["Time (s)", "Applied Voltage (V)", "Measured Current (A)", "Resistance (Ohms)"])
+            # Open the data file once for the whole sweep instead of once per point
+            self.data_file = open(self.data_filepath, 'w', newline='', buffering=1 << 16)
+            writer = csv.writer(self.data_file)
+            writer.writerow([f"# Sample Name: {params['sample_name']}"])
+            writer.writerow([f"# Voltage Sweep: {start_v}V to {stop_v}V, {steps} steps, {self.delay_ms/1000}s delay"])
+            writer.writerow(["Time (s)", "Applied Voltage (V)", "Measured Current (A)", "Resistance (Ohms)"])
+            self.data_file.flush()
+            self.rows_since_flush = 0
             self.log(f"Output file created: {os.path.basename(self.data_filepath)}")
 
             self.is_running = True
+            self.stop_event.clear()
             self.start_time = time.time()
             self.start_button.config(state='disabled'); self.stop_button.config(state='normal')
-            for key in self.data_storage: self.data_storage[key].clear()
+            for key in self.data_storage: self.data_storage[key] = np.empty(steps, dtype=np.float64)
+            self.data_count = 0
+            self.plotted_count = 0
+            self.plot_bounds = {key: [np.inf, -np.inf] for key in ('v', 'i', 'r')}
+            self.shown_limits = {}
 
             # Clear both plot lines
             self.line_iv.set_data([], [])
             self.line_rv.set_data([], [])
 
-            # Perform a full redraw to clear plots and set the new title
-            for ax in [self.ax_iv, self.ax_rv]: ax.relim(); ax.autoscale_view()
+            # The voltage axis spans the known sweep range from the start, so only the
+            # current and resistance bounds can ever force a background recapture
+            v_lo, v_hi = min(start_v, stop_v), max(start_v, stop_v)
+            self.plot_bounds['v'] = [v_lo, v_hi]
+            self.shown_limits['v'] = self._padded_limits(v_lo, v_hi)
+            for ax in [self.ax_iv, self.ax_rv]: ax.set_xlim(*self.shown_limits['v'])
+
+            # The title keeps its height, so the layout from create_graph_frame (and the last
+            # resize) still holds; the background capture below does the one full redraw
             self.ax_iv.set_title(f"I-V Curve: {params['sample_name']}", fontweight='bold')
-            self.figure.tight_layout(pad=3.0)
-            self.canvas.draw()
             self.log("Measurement sweep started.")
             
             # --- Performance Improvement: Capture static background for blitting ---
             for line in [self.line_iv, self.line_rv]: line.set_animated(True)
-            self.canvas.draw()
-            self.plot_backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in [self.ax_iv, self.ax_rv]]
+            self._capture_plot_backgrounds()
             self.log("Blitting enabled for fast graph updates.")
 
+            # Drop anything a previous, stopped worker left behind (e.g. its MSG_DONE)
+            while not self.data_queue.empty(): self.data_queue.get_nowait()
+
             # Start the worker thread and the queue processor
             self.measurement_thread = threading.Thread(target=self._measurement_worker, args=(self.voltage_list, self.delay_ms), daemon=True)
             self.measurement_thread.start()
-            self.root.after(100, self._process_data_queue)
+            # Poll about twice per point: fast sweeps are drawn without a fixed 200 ms lag,
+            # slow ones do not wake the GUI more than 5 times a second
+            self.poll_interval_ms = max(20, min(200, self.delay_ms // 2))
+            self.root.after(self.poll_interval_ms, self._process_data_queue)
 
         except Exception as e:
+            self._close_data_file()
             self.log(f"ERROR during startup: {traceback.format_exc()}")
             messagebox.showerror("Initialization Error", f"Could not start measurement.\n{e}")
 
     def stop_measurement(self, from_user=True):
         if self.is_running:
             self.is_running = False
+            # Wake the worker out of its settle wait before anything is torn down
+            self.stop_event.set()
             self.log("Measurement loop stopped by user.")
-            self.start_button.config(state='normal'); self.stop_button.config(state='disabled')
+            # Start stays disabled until the instrument is closed in _finish_stop
+            self.stop_button.config(state='disabled')
             # Turn off animation for any final redraws
             for line in [self.line_iv, self.line_rv]: line.set_animated(False)
             self.plot_backgrounds = None
-            if self.backend:
-                self.backend.close_instruments()
-            self.log("Instrument connection closed.")
-            if from_user:
-                messagebox.showinfo("Info", "Measurement stopped and instrument disconnected.")
+            self._finish_stop(from_user)
+
+    def _finish_stop(self, from_user):
+        """
+        Polled through root.after until the worker has exited, so the Tk loop never
+        blocks on it and no VISA read is still in flight when the session closes;
+        then saves the points still queued and closes the file and instrument.
+        """
+        if self.measurement_thread and self.measurement_thread.is_alive():
+            self.root.after(100, self._finish_stop, from_user)
+            return
+        # Points the worker queued before it saw the stop still belong in the file
+        rows, _, _ = self._drain_data_queue()
+        self._write_rows(rows)
+        if self.data_count > self.plotted_count: self._update_plots(self.plotted_count)
+        self._close_data_file()
+        if self.backend:
+            self.backend.close_instruments()
+        self.log("Instrument connection closed.")
+        self.start_button.config(state='normal')
+        if self.exit_after_stop:
+            self._destroy_window()
+        elif from_user:
+            messagebox.showinfo("Info", "Measurement stopped and instrument disconnected.")
 
     def _measurement_worker(self, voltage_list, delay_ms):
         """Worker thread to perform measurements and put data into a queue."""
-        for i, voltage in enumerate(voltage_list):
-            if not self.is_running: break
+        # stop_event is the only state shared with the GUI thread; is_running belongs to the GUI
+        for voltage in voltage_list:
+            if self.stop_event.is_set(): break
             try:
                 self.backend.set_voltage(voltage)
-                self.data_queue.put(f"LOG:Step {i + 1}/{len(voltage_list)}: Set V = {voltage:.3f} V. Waiting {delay_ms}ms...")
-                time.sleep(delay_ms / 1000.0)
-                
+                # Settle for the requested delay, but return at once if Stop is pressed
+                if self.stop_event.wait(delay_ms / 1000.0): break
+
                 res, cur, volt = self.backend.get_measurement()
                 elapsed_time = time.time() - self.start_time
-                self.data_queue.put((res, cur, volt, elapsed_time))
+                self.data_queue.put((MSG_DATA, res, cur, volt, elapsed_time))
             except Exception as e:
-                self.data_queue.put(e)
+                self.data_queue.put((MSG_ERROR, e))
                 break
-        self.data_queue.put("SWEEP_COMPLETE")
+        self.data_queue.put((MSG_DONE,))
 
     def _process_data_queue(self):
-        """Processes data from the queue to update the GUI. Runs in the main thread."""
-        try:
-            while not self.data_queue.empty():
-                data = self.data_queue.get_nowait()
+        """
+        Processes data from the queue to update the GUI. Runs in the main thread.
+        Drains everything queued since the last tick first, then redraws the plots
+        once, so a burst of K points costs one blit rather than K.
+        """
+        rows, finished, error = self._drain_data_queue()
+        self._write_rows(rows)
+        if self.data_count > self.plotted_count and not self._hidden:
+            self._update_plots(self.plotted_count)
+
+        if not self.is_running:
+            # Stopped by the user: the worker's MSG_DONE is not a completed sweep,
+            # and _finish_stop handles the rest of the teardown
+            return
+        if finished:
+            self.log("Sweep finished.")
+            self.stop_measurement(from_user=False)
+            messagebox.showinfo("Finished", "I-V sweep complete.")
+        elif error is not None:
+            details = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            self.log(f"RUNTIME ERROR in worker thread: {details}")
+            self.stop_measurement(from_user=False)
+            messagebox.showerror("Runtime Error", "A critical error occurred. Check console.")
+        else:
+            self.root.after(self.poll_interval_ms, self._process_data_queue)
 
-                if isinstance(data, str) and data.startswith("LOG:"):
-                    self.log(data[4:])
-                elif isinstance(data, str) and data == "SWEEP_COMPLETE":
-                    self.log("Sweep finished.")
-                    self.stop_measurement(from_user=False)
-                    messagebox.showinfo("Finished", "I-V sweep complete.")
-                    return
-                elif isinstance(data, Exception):
-                    self.log(f"RUNTIME ERROR in worker thread: {traceback.format_exc()}")
-                    self.stop_measurement(from_user=False)
-                    messagebox.showerror("Runtime Error", "A critical error occurred. Check console.")
-                    return
-                else:
-                    res, cur, volt, elapsed_time = data
-                    self.log(f"  Read -> V: {volt:.3e} V, I: {cur:.3e} A, R: {res:.3e} Ω")
-                    with open(self.data_filepath, 'a', newline='') as f:
-                        csv.writer(f).writerow([f"{elapsed_time:.3f}", f"{volt:.4e}", f"{cur:.4e}", f"{res:.4e}"])
-
-                    self.data_storage['time'].append(elapsed_time); self.data_storage['voltage_applied'].append(volt)
-                    self.data_storage['current_measured'].append(cur); self.data_storage['resistance'].append(res)
-
-                    # --- Performance Improvement: Use blitting for fast graph updates ---
-                    if self.plot_backgrounds:
-                        # Restore the clean background
-                        self.canvas.restore_region(self.plot_backgrounds[0])
-                        self.canvas.restore_region(self.plot_backgrounds[1])
-
-                        # Update data and redraw only the artists
-                        self.line_iv.set_data(self.data_storage['voltage_applied'], self.data_storage['current_measured'])
-                        self.line_rv.set_data(self.data_storage['voltage_applied'], self.data_storage['resistance'])
-                        for ax in [self.ax_iv, self.ax_rv]: ax.relim(); ax.autoscale_view()
-
-                        self.ax_iv.draw_artist(self.line_iv)
-                        self.ax_rv.draw_artist(self.line_rv)
-                        self.canvas.blit(self.figure.bbox)
-                    else:
-                        # Fallback to a full redraw if blitting isn't ready
-                        self.canvas.draw_idle()
-
-        except queue.Empty:
-            pass # No data to process, which is normal
+    def _drain_data_queue(self):
+        """
+        Takes everything the worker has queued, storing each point and formatting
+        its data-file row. Returns (rows, finished, error).
+        """
+        rows = []
+        finished, error = False, None
+        while True:
+            try:
+                data = self.data_queue.get_nowait()
+            except queue.Empty:
+                break # No data to process, which is normal
+
+            op = data[0]
+            if op == MSG_DATA:
+                _, res, cur, volt, elapsed_time = data
+                # One console line per point, written once the reading is in
+                self.log(f"Step {self.data_count + 1}/{len(self.voltage_list)}: V: {volt:.3e} V, I: {cur:.3e} A, R: {res:.3e} Ω")
+                rows.append(self.DATA_ROW_FORMAT % (elapsed_time, volt, cur, res))
+
+                n = self.data_count
+                if n >= len(self.data_storage['time']): continue # Never more points than steps; guard anyway
+                self.data_storage['time'][n] = elapsed_time; self.data_storage['voltage_applied'][n] = volt
+                self.data_storage['current_measured'][n] = cur; self.data_storage['resistance'][n] = res
+                self.data_count = n + 1
+            elif op == MSG_DONE:
+                finished = True; break
+            else: # MSG_ERROR
+                error = data[1]; break
+        return rows, finished, error
+
+    def _write_rows(self, rows):
+        if rows and self.data_file:
+            self.data_file.write(''.join(rows))
+            self.rows_since_flush += len(rows)
+            if self.rows_since_flush >= self.FLUSH_EVERY_N_ROWS:
+                self.data_file.flush(); self.rows_since_flush = 0
+
+    def _update_plots(self, first_new):
+        """Hands the recorded points to both lines and redraws them with a single blit."""
+        n = self.data_count
+        # Slices are views into the preallocated arrays, so nothing is copied here.
+        # Past two points per pixel the extra segments are invisible, so stride them out.
+        stride = max(1, n // (2 * self.plot_width_px))
+        v = self.data_storage['voltage_applied'][:n:stride]
+        self.line_iv.set_data(v, self.data_storage['current_measured'][:n:stride])
+        self.line_rv.set_data(v, self.data_storage['resistance'][:n:stride])
+        limits_changed = self._update_plot_bounds(first_new)
+        self.plotted_count = n
+
+        # --- Performance Improvement: Use blitting for fast graph updates ---
+        if self.plot_backgrounds:
+            if limits_changed:
+                # Rare path: the ticks and grid moved, so the cached backgrounds are stale
+                self._capture_plot_backgrounds()
+
+            # Restore the clean background and redraw only the artists
+            self.canvas.restore_region(self.plot_backgrounds['iv'])
+            self.canvas.restore_region(self.plot_backgrounds['rv'])
+            self.ax_iv.draw_artist(self.line_iv)
+            self.ax_rv.draw_artist(self.line_rv)
+            self.canvas.blit(self.figure.bbox)
+        else:
+            # Fallback to a full redraw if blitting isn't ready
+            self.canvas.draw_idle()
 
-        if self.is_running:
-            self.root.after(200, self._process_data_queue)
+    def _update_plot_bounds(self, first_new):
+        """
+        Widens the running V/I/R bounds with the points recorded since `first_new` and
+        resets the axis limits only when a bound leaves the padded range already shown.
+        Replaces relim(), which rescanned every point. Returns True if any limit changed.
+        """
+        changed = False
+        n, ds = self.data_count, self.data_storage
+        for key, column in (('v', 'voltage_applied'), ('i', 'current_measured'), ('r', 'resistance')):
+            values = ds[column][first_new:n]
+            values = values[np.isfinite(values) & (values > 0)] if key == 'r' else values[np.isfinite(values)]
+            if not values.size: continue
+            b = self.plot_bounds[key]
+            b[0], b[1] = min(b[0], values.min()), max(b[1], values.max())
+            shown = self.shown_limits.get(key)
+            if shown is None or b[0] < shown[0] or b[1] > shown[1]:
+                self.shown_limits[key] = self._padded_limits(b[0], b[1], log=(key == 'r'))
+                changed = True
+        if changed:
+            limits = self.shown_limits
+            if 'v' in limits: self.ax_iv.set_xlim(*limits['v']); self.ax_rv.set_xlim(*limits['v'])
+            if 'i' in limits: self.ax_iv.set_ylim(*limits['i'])
+            if 'r' in limits: self.ax_rv.set_ylim(*limits['r'])
+        return changed
+
+    def _padded_limits(self, lo, hi, log=False):
+        """Returns (lo, hi) widened by 10% of the span, measured in decades on a log axis."""
+        if log:
+            lo, hi = np.log10(lo), np.log10(hi)
+            pad = 0.1 * (hi - lo) or 0.5
+            return 10 ** (lo - pad), 10 ** (hi + pad)
+        pad = 0.1 * (hi - lo) or 0.1 * abs(hi) or 1.0
+        return lo - pad, hi + pad
+
+    def _on_root_unmap(self, event):
+        if event.widget is self.root: self._hidden = True
+
+    def _on_root_map(self, event):
+        if event.widget is not self.root or not self._hidden: return
+        self._hidden = False
+        # Catch up with every point recorded while the window was minimised
+        if self.plot_backgrounds:
+            self._capture_plot_backgrounds()
+            if self.data_count > self.plotted_count: self._update_plots(self.plotted_count)
+        else: self.canvas.draw_idle()
+
+    def _close_data_file(self, from_atexit=False):
+        if self.data_file:
+            try:
+                self.data_file.flush()
+                # fsync once at the end of the sweep rather than per row
+                os.fsync(self.data_file.fileno())
+                self.data_file.close()
+            except Exception as e:
+                # Tk is already gone when atexit runs, so that path reports on stderr
+                if from_atexit: print(f"Warning: Issue closing data file: {e}", file=sys.stderr)
+                else: self.log(f"Warning: Issue closing data file: {e}")
+            finally:
+                self.data_file = None
 
     def _scan_for_visa_instruments(self):
         if not pyvisa:
             self.log("ERROR: PyVISA is not installed. Cannot scan.")
             return
         try:
-            rm = pyvisa.ResourceManager()
+            # Opening the VISA library is the slow part of a scan, so do it only once
+            if self.rm is None: self.rm = pyvisa.ResourceManager()
             self.log("Scanning for VISA instruments...")
-            resources = rm.list_resources()
+            resources = self.rm.list_resources()
             if resources:
                 self.log(f"Found: {resources}")
                 self.keithley_combobox['values'] = resources
                 # Attempt to find a likely candidate for the Keithley
-                for res in resources:
-                    if "GPIB" in res.upper() and ("27" in res or "26" in res or "25" in res):
-                        self.keithley_combobox.set(res); break
-                else: self.keithley_combobox.set(resources[0])
+                keithley_hit = next((r for r in resources if self.KEITHLEY_ADDR_RE.search(r)), None)
+                self.keithley_combobox.set(keithley_hit or resources[0])
             else:
                 self.log("No VISA instruments found.")
                 self.keithley_combobox['values'] = []; self.keithley_combobox.set("")
@@ -603,12 +903,20 @@ class HighResistanceIV_GUI:
 
     def _on_closing(self):
         if self.is_running:
-            if messagebox.askyesno("Exit", "Measurement sweep is running. Stop and exit?"):
-                self.stop_measurement(from_user=False); self.root.destroy()
-        else:
-            if self.backend and self.backend.is_connected:
-                self.backend.close_instruments()
-            self.root.destroy()
+            if not messagebox.askyesno("Exit", "Measurement sweep is running. Stop and exit?"): return
+            # The window is destroyed by _finish_stop once the instrument is closed
+            self.exit_after_stop = True
+            self.stop_measurement(from_user=False)
+            return
+        if self.backend and self.backend.is_connected:
+            self.backend.close_instruments()
+        self._destroy_window()
+
+    def _destroy_window(self):
+        if self.rm is not None:
+            try: self.rm.close()
+            except Exception: pass
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
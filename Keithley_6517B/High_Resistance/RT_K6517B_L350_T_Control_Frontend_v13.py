@@ -12,7 +12,10 @@
 import tkinter as tk
 from tkinter import ttk, Label, Entry, LabelFrame, Button, filedialog, messagebox, scrolledtext, Canvas
 import threading, queue
+import numpy as np
 import os
+import atexit
+import sys
 import time
 import traceback
 from datetime import datetime
@@ -46,6 +49,15 @@ except ImportError:
 import runpy
 from multiprocessing import Process
 
+# --- Fonts (built once at import; the GUI class aliases them) ---
+FONT_SIZE_BASE = 11
+FONT_BASE = ('Segoe UI', FONT_SIZE_BASE)
+FONT_SUB_LABEL = ('Segoe UI', FONT_SIZE_BASE - 2)
+FONT_TITLE = ('Segoe UI', FONT_SIZE_BASE + 2, 'bold')
+FONT_HEADER = ('Segoe UI', FONT_SIZE_BASE + 4, 'bold')
+FONT_INSTITUTE = ('Segoe UI', FONT_SIZE_BASE + 6, 'bold')
+FONT_CONSOLE = ('Consolas', 10)
+
 def run_script_process(script_path):
     """
     Wrapper function to execute a script using runpy in its own directory.
@@ -91,6 +103,8 @@ def launch_gpib_scanner():
 
 class Lakeshore350_Backend:
     """A class to control the Lakeshore Model 350 Temperature Controller."""
+    RANGE_MAP = {'off': 0, 'low': 2, 'medium': 4, 'high': 5} # Keys are lowercase
+
     def __init__(self, visa_address):
         self.instrument = None
         rm = pyvisa.ResourceManager()
@@ -98,25 +112,26 @@ class Lakeshore350_Backend:
         self.instrument.timeout = 10000
         print(f"Lakeshore Connected: {self.instrument.query('*IDN?').strip()}")
 
+    # *OPC? returns once the preceding commands have been processed, so setup
+    # waits exactly as long as the instrument needs instead of a fixed sleep.
     def reset_and_clear(self):
-        self.instrument.write('*RST'); time.sleep(0.5)
-        self.instrument.write('*CLS'); time.sleep(1)
+        self.instrument.write('*RST'); self.instrument.query('*OPC?')
+        self.instrument.write('*CLS')
 
     def setup_heater(self, output, resistance_code, max_current_code):
         self.instrument.write(f'HTRSET {output},{resistance_code},{max_current_code},0,1')
-        time.sleep(0.5)
+        self.instrument.query('*OPC?')
 
     def setup_ramp(self, output, rate_k_per_min, ramp_on=True):
         """ Configures the instrument's internal ramp generator. """
         self.instrument.write(f'RAMP {output},{1 if ramp_on else 0},{rate_k_per_min}')
-        time.sleep(0.5)
+        self.instrument.query('*OPC?')
 
     def set_setpoint(self, output, temperature_k):
         self.instrument.write(f'SETP {output},{temperature_k}')
 
     def set_heater_range(self, output, heater_range):
-        range_map = {'off': 0, 'low': 2, 'medium': 4, 'high': 5}
-        range_code = range_map.get(heater_range.lower())
+        range_code = self.RANGE_MAP.get(heater_range)
         if range_code is None: raise ValueError("Invalid heater range.")
         self.instrument.write(f'RANGE {output},{range_code}')
 
@@ -126,6 +141,11 @@ class Lakeshore350_Backend:
     def get_heater_output(self, output):
         return float(self.instrument.query(f'HTR? {output}').strip())
 
+    def get_temperature_and_heater(self, sensor, output):
+        """Reads temperature and heater output in one compound query (one bus round trip)."""
+        temp, htr = self.instrument.query(f'KRDG? {sensor};HTR? {output}').strip().split(';')
+        return float(temp), float(htr)
+
     def close(self):
         if self.instrument:
             try:
@@ -145,9 +165,18 @@ class Combined_Backend:
         self.lakeshore = None
         self.keithley = None
         self.params = {}
+        # Hot-path parameters, copied out of `params` in initialize_instruments
+        self.source_voltage = 0.0
+        self.delay = 0.0
+        self.cutoff = None
+        self.end_temp = None
 
     def initialize_instruments(self, parameters):
         self.params = parameters
+        self.source_voltage = parameters['source_voltage']
+        self.delay = parameters['delay']
+        self.cutoff = parameters['cutoff']
+        self.end_temp = parameters['end_temp']
         print("\n--- [Backend] Initializing Instruments ---")
         self.lakeshore = Lakeshore350_Backend(self.params['lakeshore_visa'])
         self.lakeshore.reset_and_clear()
@@ -168,25 +197,26 @@ class Combined_Backend:
         self.keithley.measure_resistance()
         print("  Step 1: Enabling Zero Check (shorts the input)...")
         self.keithley.write(':SYSTem:ZCHeck ON')
-        time.sleep(2)
+        self.keithley.ask('*OPC?')
+        time.sleep(1) # Let the shorted input settle before acquiring the offset
         print("  Step 2: Acquiring the zero correction value...")
         self.keithley.write(':SYSTem:ZCORrect:ACQuire')
-        time.sleep(3)
+        self.keithley.ask('*OPC?')
         print("  Step 3: Disabling Zero Check...")
         self.keithley.write(':SYSTem:ZCHeck OFF')
-        time.sleep(1)
+        self.keithley.ask('*OPC?')
         print("  Step 4: Enabling Zero Correction for all measurements...")
         self.keithley.write(':SYSTem:ZCORrect ON')
-        time.sleep(1)
+        self.keithley.ask('*OPC?')
         print("  Zero Correction Complete.")
 
-    def get_measurement(self):
-        time.sleep(self.params['delay'])
-        current_temp = self.lakeshore.get_temperature('A')
-        heater_output = self.lakeshore.get_heater_output(1)
+    def get_measurement(self, stop_event):
+        """Waits the settling delay, then takes one sample; returns None if `stop_event` is set meanwhile."""
+        if stop_event.wait(self.delay): return None
+        current_temp, heater_output = self.lakeshore.get_temperature_and_heater('A', 1)
         resistance = self.keithley.resistance
         if resistance != 0 and resistance != float('inf') and resistance == resistance:
-            current = self.params['source_voltage'] / resistance
+            current = self.source_voltage / resistance
         else:
             current = 0.0
         return current_temp, heater_output, current, resistance
@@ -224,11 +254,17 @@ class Integrated_RT_GUI:
     CLR_ACCENT_RED = '#E74C3C'
     CLR_CONSOLE_BG = '#1E2B38'
     CLR_GRAPH_BG = '#FFFFFF'
-    FONT_SIZE_BASE = 11
-    FONT_BASE = ('Segoe UI', FONT_SIZE_BASE)
-    FONT_SUB_LABEL = ('Segoe UI', FONT_SIZE_BASE - 2)
-    FONT_TITLE = ('Segoe UI', FONT_SIZE_BASE + 2, 'bold')
-    FONT_CONSOLE = ('Consolas', 10)
+    FONT_SIZE_BASE = FONT_SIZE_BASE
+    FONT_BASE = FONT_BASE
+    FONT_SUB_LABEL = FONT_SUB_LABEL
+    FONT_TITLE = FONT_TITLE
+    FONT_HEADER = FONT_HEADER
+    FONT_INSTITUTE = FONT_INSTITUTE
+    FONT_CONSOLE = FONT_CONSOLE
+    DATA_CAPACITY = 4096 # Initial size of the plot buffers; doubled when full
+    # Fixed data-row layout, written without csv.writer; CRLF matches the csv header rows
+    DATA_ROW_FORMAT = "%s,%.2f,%.4f,%.2f,%.4e,%.4e,%.4e\r\n"
+    MAX_PLOT_POINTS = 2000 # Roughly the pixel width of the axes; the data file keeps every point
 
     def __init__(self, root):
         self.root = root
@@ -241,14 +277,29 @@ class Integrated_RT_GUI:
         self.is_stabilizing = False
         self.start_time = None
         self.plot_backgrounds = None # For blitting
+        self._resize_job = None # Pending debounced layout/background rebuild
         self.backend = Combined_Backend()
         self.file_location_path = ""
-        self.data_storage = {'time': [], 'temperature': [], 'current': [], 'resistance': []}
+        # Preallocated float64 buffers; only the first `data_count` entries are valid.
+        self.data_storage = {key: np.empty(self.DATA_CAPACITY) for key in ('time', 'temperature', 'current', 'resistance')}
+        self.data_count = 0
+        self.plotted_count = 0 # data_count at the last plot update
+        self.ui_stride = 1 # New samples required before the plots are redrawn
+        # Running [xmin, xmax, ymin, ymax] of the main, sub1 and sub2 plots (replaces relim)
+        self.plot_bounds = [[np.inf, -np.inf, np.inf, -np.inf] for _ in range(3)]
         self.log_scale_var = tk.BooleanVar(value=True)
         self.current_heater_range = 'off'
         self.logo_image = None # Attribute to hold the logo image reference
         self.data_queue = queue.Queue()
         self.measurement_thread = None
+        self.stop_event = threading.Event() # Wakes the worker out of its waits on stop
+        self.exit_after_stop = False # Set by _on_closing: destroy the window once the stop completes
+        self.data_file = None # Kept open for the whole run
+        atexit.register(self._close_data_file, from_atexit=True) # Last-chance flush if the process exits mid-run
+        self.pending_rows = [] # Formatted rows waiting for the next batched write
+        self.last_flush_time = 0.0
+
+        self.last_log_prefix, self.last_log_time = None, 0.0
 
         self.setup_styles()
         self.create_widgets()
@@ -298,12 +349,9 @@ class Integrated_RT_GUI:
         self.create_graph_frame(right_panel)
 
     def create_header(self):
-        # --- NEW: Define an italic font for the program name ---
-        font_title_main = ('Segoe UI', self.FONT_SIZE_BASE + 4, 'bold')
-
         header_frame = tk.Frame(self.root, bg=self.CLR_HEADER)
         header_frame.pack(side='top', fill='x')
-        Label(header_frame, text="K6517B & L350: R-T Measurement (T-Control)", bg=self.CLR_HEADER, fg=self.CLR_ACCENT_GOLD, font=font_title_main).pack(side='left', padx=20, pady=10)
+        Label(header_frame, text="K6517B & L350: R-T Measurement (T-Control)", bg=self.CLR_HEADER, fg=self.CLR_ACCENT_GOLD, font=self.FONT_HEADER).pack(side='left', padx=20, pady=10)
 
         # --- Plotter Launch Button ---
         plotter_button = ttk.Button(header_frame, text="📈", command=launch_plotter_utility, width=3)
@@ -326,8 +374,18 @@ class Integrated_RT_GUI:
 
         if PIL_AVAILABLE and os.path.exists(self.LOGO_FILE_PATH):
             try:
-                img = Image.open(self.LOGO_FILE_PATH)
-                img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.LANCZOS)
+                # The resized logo is cached as a PNG next to the source so later
+                # launches skip the JPEG decode and LANCZOS resample.
+                cache_path = f"{self.LOGO_FILE_PATH}.{self.LOGO_SIZE}px.cache.png"
+                if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.LOGO_FILE_PATH):
+                    img = Image.open(cache_path)
+                else:
+                    img = Image.open(self.LOGO_FILE_PATH)
+                    img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.LANCZOS)
+                    try:
+                        img.save(cache_path, 'PNG')
+                    except OSError:
+                        pass # Read-only install; just rebuild next time
                 self.logo_image = ImageTk.PhotoImage(img)
                 logo_canvas.create_image(self.LOGO_SIZE/2, self.LOGO_SIZE/2, image=self.logo_image)
             except Exception as e:
@@ -337,9 +395,8 @@ class Integrated_RT_GUI:
             logo_canvas.create_text(self.LOGO_SIZE/2, self.LOGO_SIZE/2, text="LOGO\nMISSING", font=self.FONT_BASE, fill=self.CLR_FG_LIGHT, justify='center')
 
         # Institute Name (larger font)
-        institute_font = ('Segoe UI', self.FONT_SIZE_BASE + 6, 'bold')
-        ttk.Label(frame, text="UGC-DAE Consortium for Scientific Research", font=institute_font, background=self.CLR_BG_DARK).grid(row=0, column=1, padx=10, pady=(10,0), sticky='sw')
-        ttk.Label(frame, text="Mumbai Centre", font=institute_font, background=self.CLR_BG_DARK).grid(row=1, column=1, padx=10, sticky='nw')
+        ttk.Label(frame, text="UGC-DAE Consortium for Scientific Research", font=self.FONT_INSTITUTE, background=self.CLR_BG_DARK).grid(row=0, column=1, padx=10, pady=(10,0), sticky='sw')
+        ttk.Label(frame, text="Mumbai Centre", font=self.FONT_INSTITUTE, background=self.CLR_BG_DARK).grid(row=1, column=1, padx=10, sticky='nw')
 
         # --- MODIFIED: Use a separator instead of a new frame ---
         ttk.Separator(frame, orient='horizontal').grid(row=2, column=1, sticky='ew', padx=10, pady=8)
@@ -432,15 +489,57 @@ class Integrated_RT_GUI:
         self.ax_sub2.set_ylabel("Temperature (K)")
         self.ax_sub2.grid(True, linestyle='--', alpha=0.6)
         self.figure.tight_layout(pad=3.0)
+        # The layout only depends on the canvas size, so re-solve it on resize rather than per sample
+        self.canvas.mpl_connect('resize_event', self._on_canvas_resize)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+    def _on_canvas_resize(self, event):
+        # Resize events arrive in bursts while the window is dragged; rebuild once it settles
+        if self._resize_job: self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(100, self._recapture_after_resize)
+
+    def _recapture_after_resize(self):
+        self._resize_job = None
+        self.figure.tight_layout(pad=3.0)
+        if self.plot_backgrounds:
+            self._capture_plot_backgrounds()
+            self._update_plots() # Put the lines back over the fresh background
+        else:
+            self.canvas.draw_idle()
+
     def _update_y_scale(self):
-        if self.log_scale_var.get(): self.ax_main.set_yscale('log')
-        else: self.ax_main.set_yscale('linear')
-        self.canvas.draw()
+        log_y = self.log_scale_var.get()
+        self.ax_main.set_yscale('log' if log_y else 'linear')
+        # The running y bounds were built with the previous scale's filter (a linear
+        # axis keeps R <= 0), so rebuild them from the whole buffer for the new scale
+        b = self.plot_bounds[0]
+        y = self.data_storage['resistance'][:self.data_count]
+        y = y[np.isfinite(y) & (y > 0)] if log_y else y[np.isfinite(y)]
+        if y.size:
+            b[2], b[3] = y.min(), y.max()
+            self.ax_main.set_ylim(*self._padded_limits(b[2], b[3], log_y))
+        else:
+            b[2], b[3] = np.inf, -np.inf
+        # While blitting, the cached backgrounds must be rebuilt for the new scale
+        if self.plot_backgrounds:
+            self._capture_plot_backgrounds()
+            self._update_plots() # Put the lines back over the fresh background
+        else:
+            self.canvas.draw()
 
-    def log(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
+    def _capture_plot_backgrounds(self):
+        """Full redraw without the animated lines, then cache each axes for blitting."""
+        self.canvas.draw()
+        self.plot_backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]]
+
+    def log(self, message, throttle=False):
+        # Throttled messages sharing a prefix (text before the first ':') with the
+        # previous one are dropped for 2 s, e.g. the repeated "Stabilizing..." lines.
+        if throttle:
+            prefix, now = message.split(':', 1)[0], time.monotonic()
+            if prefix == self.last_log_prefix and now - self.last_log_time < 2: return
+            self.last_log_prefix, self.last_log_time = prefix, now
+        timestamp = time.strftime("%H:%M:%S")
         self.console_widget.config(state='normal')
         self.console_widget.insert('end', f"[{timestamp}] {message}\n")
         self.console_widget.see('end')
@@ -475,16 +574,29 @@ class Integrated_RT_GUI:
                 writer = csv.writer(f)
                 writer.writerow([f"# Sample: {params['sample_name']}", f"Source V: {params['source_voltage']}V"])
                 writer.writerow(["Timestamp", "Elapsed Time (s)", "Temperature (K)", "Heater Output (%)", "Applied Voltage (V)", "Measured Current (A)", "Resistance (Ohm)"])
+            # One buffered handle for the whole run instead of an open/close per sample
+            # O_APPEND makes every write land at the end of the file; O_CLOEXEC
+            # keeps the handle out of the plotter/scanner subprocesses (POSIX only).
+            # O_BINARY stops the Windows CRT turning each row's '\r\n' into '\r\r\n'.
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_CLOEXEC', 0) | getattr(os, 'O_BINARY', 0)
+            fd = os.open(self.data_filepath, flags, 0o644)
+            self.data_file = os.fdopen(fd, 'w', newline='', buffering=1 << 20)
+            self.pending_rows.clear()
+            self.last_flush_time = time.time()
 
             self.log(f"Output file created: {os.path.basename(self.data_filepath)}")
             self.is_stabilizing, self.is_running = True, False
             self.start_button.config(state='disabled'); self.stop_button.config(state='normal')
-            for key in self.data_storage: self.data_storage[key].clear()
+            self.data_count = self.plotted_count = 0
+            # Every sample is logged, but the plots refresh at most about once a second
+            self.ui_stride = max(1, int(1.0 / params['delay']))
+            for bounds in self.plot_bounds: bounds[:] = [np.inf, -np.inf, np.inf, -np.inf]
             for line in [self.line_main, self.line_sub1, self.line_sub2]: line.set_data([], [])
             self.ax_main.set_title(f"R-T Curve: {params['sample_name']}", fontweight='bold')
             self.canvas.draw()
             self.log("Starting stabilization process...")
             
+            self.stop_event.clear()
             self.measurement_thread = threading.Thread(target=self._measurement_worker, daemon=True)
             self.measurement_thread.start()
             self.root.after(100, self._process_data_queue)
@@ -496,32 +608,68 @@ class Integrated_RT_GUI:
     def stop_measurement(self, from_user=True):
         if self.is_running or self.is_stabilizing:
             self.is_running, self.is_stabilizing = False, False
+            # Wake the worker out of its settling wait before anything is torn down
+            self.stop_event.set()
             self.log("Measurement stopped by user.")
-            self.start_button.config(state='normal'); self.stop_button.config(state='disabled')
-            # This backend call will automatically turn the heater off.
-            self.backend.close_instruments()
-            if from_user:
-                messagebox.showinfo("Info", "Measurement stopped and instruments disconnected.")
+            # Leave blitting so the final curves survive ordinary redraws
+            for line in [self.line_main, self.line_sub1, self.line_sub2]: line.set_animated(False)
+            self.plot_backgrounds = None
+            self.canvas.draw_idle()
+            # Start stays disabled until the instruments are closed in _finish_stop
+            self.stop_button.config(state='disabled')
+            self._finish_stop(from_user)
+
+    def _finish_stop(self, from_user):
+        """
+        Polled through root.after until the worker has exited, so the Tk loop never
+        blocks on it and no VISA read is still in flight when the session closes;
+        then saves the rows still queued and closes the file and instruments.
+        """
+        if self.measurement_thread and self.measurement_thread.is_alive():
+            self.root.after(100, self._finish_stop, from_user)
+            return
+        # Samples the worker queued before it saw the stop still belong in the file
+        while True:
+            try:
+                data = self.data_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(data, tuple): self._record_sample(data)
+        if self.data_count > self.plotted_count: self._update_plots()
+        self._close_data_file()
+        # This backend call will automatically turn the heater off.
+        self.backend.close_instruments()
+        self.start_button.config(state='normal')
+        if self.exit_after_stop:
+            self.root.destroy()
+        elif from_user:
+            messagebox.showinfo("Info", "Measurement stopped and instruments disconnected.")
 
     def _measurement_worker(self):
         """Worker thread to handle stabilization and measurement loop."""
         params = self.backend.params
         try:
             # --- Stabilization Phase ---
+            last_range = None # Heater commands are only sent when the desired state changes
             while self.is_stabilizing:
                 current_temp = self.backend.lakeshore.get_temperature('A')
                 self.data_queue.put(f"LOG:Stabilizing... Current: {current_temp:.4f} K (Target: {params['start_temp']} K)")
                 
-                if current_temp > params['start_temp'] + 0.2: self.backend.lakeshore.set_heater_range(1, 'off')
-                else: self.backend.lakeshore.set_heater_range(1, 'medium'); self.backend.lakeshore.set_setpoint(1, params['start_temp'])
+                desired_range = 'off' if current_temp > params['start_temp'] + 0.2 else 'medium'
+                if desired_range != last_range:
+                    self.backend.lakeshore.set_heater_range(1, desired_range)
+                    if desired_range == 'medium': self.backend.lakeshore.set_setpoint(1, params['start_temp'])
+                    last_range = desired_range
                 
-                if abs(current_temp - params['start_temp']) < 0.1:
+                deviation = abs(current_temp - params['start_temp'])
+                if deviation < 0.1:
                     self.data_queue.put(f"LOG:Stabilized at {current_temp:.4f} K. Waiting 5s before ramp...")
-                    time.sleep(5)
+                    if self.stop_event.wait(5) or not self.is_stabilizing: break
                     self.is_stabilizing = False
                     self.is_running = True
                     break
-                time.sleep(2)
+                # Poll slowly while far from the target and quickly near it
+                self.stop_event.wait(5 if deviation > 2 else 1 if deviation > 0.3 else 0.25)
 
             # --- Ramp Phase ---
             if self.is_running:
@@ -529,21 +677,20 @@ class Integrated_RT_GUI:
                 self.current_heater_range = 'high'; self.backend.lakeshore.set_heater_range(1, self.current_heater_range)
                 self.data_queue.put(f"LOG:Hardware ramp started towards {params['end_temp']} K at {params['rate']} K/min.")
                 self.start_time = time.time()
+                # Tk may only be touched from the main thread, so the GUI captures
+                # the blitting backgrounds when it sees this marker.
+                self.data_queue.put("RAMP_STARTED")
 
-                # --- Performance Improvement: Capture static background for blitting ---
-                # This is done here because the plot area is now stable.
-                self.canvas.draw()
-                self.plot_backgrounds = [self.canvas.copy_from_bbox(self.ax_main.bbox),
-                                         self.canvas.copy_from_bbox(self.ax_sub1.bbox),
-                                         self.canvas.copy_from_bbox(self.ax_sub2.bbox)]
-
+            backend = self.backend
             while self.is_running:
-                temp, htr, cur, res = self.backend.get_measurement()
+                sample = backend.get_measurement(self.stop_event)
+                if sample is None: break
+                temp, htr, cur, res = sample
                 elapsed = time.time() - self.start_time
                 self.data_queue.put((temp, htr, cur, res, elapsed))
                 
-                if temp >= params['cutoff']: self.data_queue.put("CUTOFF"); break
-                elif temp >= params['end_temp']: self.data_queue.put("COMPLETE"); break
+                if temp >= backend.cutoff: self.data_queue.put("CUTOFF"); break
+                elif temp >= backend.end_temp: self.data_queue.put("COMPLETE"); break
         except Exception as e:
             self.data_queue.put(e)
 
@@ -552,43 +699,135 @@ class Integrated_RT_GUI:
         try:
             while not self.data_queue.empty():
                 data = self.data_queue.get_nowait()
-                if isinstance(data, str) and data.startswith("LOG:"): self.log(data[4:])
+                if isinstance(data, str) and data.startswith("LOG:"): self.log(data[4:], throttle=True)
                 elif isinstance(data, str) and data == "CUTOFF": self.log("!!! SAFETY CUTOFF REACHED !!!"); self.stop_measurement(False); messagebox.showwarning("Cutoff", "Safety cutoff temperature reached."); return
                 elif isinstance(data, str) and data == "COMPLETE": self.log("Target temperature reached."); self.stop_measurement(False); messagebox.showinfo("Finished", "Measurement complete."); return
+                elif isinstance(data, str) and data == "RAMP_STARTED":
+                    for line in [self.line_main, self.line_sub1, self.line_sub2]: line.set_animated(True)
+                    self._capture_plot_backgrounds()
                 elif isinstance(data, Exception): self.log(f"RUNTIME ERROR: {traceback.format_exc()}"); self.stop_measurement(False); messagebox.showerror("Runtime Error", f"A critical error occurred: {data}"); return
                 else:
                     temp, htr, cur, res, elapsed = data
                     self.log(f"T:{temp:.3f}K | R:{res:.3e}Ω | Htr:{htr:.1f}% ({self.current_heater_range})")
-                    with open(self.data_filepath, 'a', newline='') as f:
-                        writer = csv.writer(f)
-                        writer.writerow([datetime.now().strftime('%Y-%m-%d %H:%M:%S'), f"{elapsed:.2f}", f"{temp:.4f}", f"{htr:.2f}", f"{self.backend.params['source_voltage']:.4e}", f"{cur:.4e}", f"{res:.4e}"])
-
-                    self.data_storage['time'].append(elapsed); self.data_storage['temperature'].append(temp)
-                    self.data_storage['current'].append(cur); self.data_storage['resistance'].append(res)
-
-                    self.line_main.set_data(self.data_storage['temperature'], self.data_storage['resistance'])
-                    self.line_sub1.set_data(self.data_storage['temperature'], self.data_storage['current']) # This was likely a bug, should be temp vs current
-                    self.line_sub2.set_data(self.data_storage['time'], self.data_storage['temperature'])
-
-                    # --- Performance Improvement: Use blitting for fast graph updates ---
-                    if self.plot_backgrounds:
-                        for bg in self.plot_backgrounds: self.canvas.restore_region(bg)
-                        for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]: ax.relim(); ax.autoscale_view()
-                        
-                        self.ax_main.draw_artist(self.line_main)
-                        self.ax_sub1.draw_artist(self.line_sub1)
-                        self.ax_sub2.draw_artist(self.line_sub2)
-                        
-                        self.canvas.blit(self.figure.bbox)
-                    else:
-                        for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]: ax.relim(); ax.autoscale_view()
-                        self.figure.tight_layout(pad=3.0); self.canvas.draw_idle()
+                    self._record_sample(data)
+
+            # Redraw once for everything drained since the last update, not once per sample
+            if self.data_count - self.plotted_count >= self.ui_stride: self._update_plots()
         except queue.Empty:
             pass
 
         if self.is_running or self.is_stabilizing:
             self.root.after(200, self._process_data_queue)
 
+    def _record_sample(self, data):
+        """Queues the data-file row for one (temp, htr, cur, res, elapsed) sample and stores it for plotting."""
+        temp, htr, cur, res, elapsed = data
+        self.pending_rows.append(self.DATA_ROW_FORMAT % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.start_time + elapsed)), elapsed, temp, htr, self.backend.source_voltage, cur, res))
+        # Batch rows: at most 10 samples or 5 s of data are held in memory
+        if len(self.pending_rows) >= 10 or time.time() - self.last_flush_time > 5: self._flush_pending_rows()
+
+        n = self.data_count
+        if n == len(self.data_storage['time']): self._grow_data_storage()
+        ds = self.data_storage
+        ds['time'][n] = elapsed; ds['temperature'][n] = temp
+        ds['current'][n] = cur; ds['resistance'][n] = res
+        self.data_count = n + 1
+
+    def _update_plots(self):
+        """Pushes the recorded data to the three lines and blits them."""
+        n, ds = self.data_count, self.data_storage
+        if n > self.MAX_PLOT_POINTS:
+            # Evenly spaced sample indices (R-T is not monotonic, so pick by
+            # index rather than by x value); first and last points are kept.
+            idx = np.linspace(0, n - 1, self.MAX_PLOT_POINTS).astype(int)
+            t_plot, temp_plot, cur_plot, res_plot = (ds[key][idx] for key in ('time', 'temperature', 'current', 'resistance'))
+        else:
+            # Views into the buffers are handed to Matplotlib without conversion
+            t_plot, temp_plot, cur_plot, res_plot = (ds[key][:n] for key in ('time', 'temperature', 'current', 'resistance'))
+        self.line_main.set_data(temp_plot, res_plot)
+        self.line_sub1.set_data(temp_plot, cur_plot)
+        self.line_sub2.set_data(t_plot, temp_plot)
+
+        # --- Performance Improvement: Use blitting for fast graph updates ---
+        limits_changed = self._update_plot_bounds(self.plotted_count)
+        self.plotted_count = n
+        if self.plot_backgrounds:
+            # Ticks and labels only change when the limits do; a full redraw
+            # (and a fresh background) is needed only in that case.
+            if limits_changed:
+                self._capture_plot_backgrounds()
+            else:
+                for bg in self.plot_backgrounds: self.canvas.restore_region(bg)
+
+            self.ax_main.draw_artist(self.line_main)
+            self.ax_sub1.draw_artist(self.line_sub1)
+            self.ax_sub2.draw_artist(self.line_sub2)
+            
+            self.canvas.blit(self.figure.bbox)
+        else:
+            self.canvas.draw_idle()
+
+    def _update_plot_bounds(self, first_new):
+        """
+        Widens the running bounds with the samples recorded since `first_new` and sets
+        new limits only where a bound moved. Only the new slice is scanned, unlike
+        relim() which rescans every point. Returns True if any axis limit changed.
+        """
+        changed = False
+        n, ds = self.data_count, self.data_storage
+        axes = [self.ax_main, self.ax_sub1, self.ax_sub2]
+        columns = [('temperature', 'resistance'), ('temperature', 'current'), ('time', 'temperature')]
+        for i, (ax, (x_key, y_key)) in enumerate(zip(axes, columns)):
+            b = self.plot_bounds[i]
+            x = ds[x_key][first_new:n]; x = x[np.isfinite(x)]
+            if x.size and (x.min() < b[0] or x.max() > b[1]):
+                b[0], b[1] = min(b[0], x.min()), max(b[1], x.max())
+                ax.set_xlim(*self._padded_limits(b[0], b[1])); changed = True
+            log_y = ax is self.ax_main and self.log_scale_var.get()
+            y = ds[y_key][first_new:n]
+            y = y[np.isfinite(y) & (y > 0)] if log_y else y[np.isfinite(y)]
+            if y.size and (y.min() < b[2] or y.max() > b[3]):
+                b[2], b[3] = min(b[2], y.min()), max(b[3], y.max())
+                ax.set_ylim(*self._padded_limits(b[2], b[3], log_y)); changed = True
+        return changed
+
+    def _padded_limits(self, lo, hi, log=False):
+        """Returns (lo, hi) widened by 2% of the span, measured in decades on a log axis."""
+        if log and lo > 0:
+            lo, hi = np.log10(lo), np.log10(hi)
+            pad = 0.02 * (hi - lo) or 0.05
+            return 10 ** (lo - pad), 10 ** (hi + pad)
+        pad = 0.02 * (hi - lo) or 0.02 * abs(hi) or 1.0
+        return lo - pad, hi + pad
+
+    def _grow_data_storage(self):
+        """Doubles the capacity of the plot buffers, keeping the recorded data."""
+        for key, arr in self.data_storage.items():
+            grown = np.empty(2 * len(arr))
+            grown[:self.data_count] = arr[:self.data_count]
+            self.data_storage[key] = grown
+
+    def _flush_pending_rows(self):
+        if self.pending_rows:
+            self.data_file.write(''.join(self.pending_rows))
+            self.pending_rows.clear()
+        self.data_file.flush()
+        self.last_flush_time = time.time()
+
+    def _close_data_file(self, from_atexit=False):
+        if self.data_file:
+            try:
+                self._flush_pending_rows()
+                # fsync once at the end of the run rather than per row
+                os.fsync(self.data_file.fileno())
+                self.data_file.close()
+            except Exception as e:
+                # Tk is already gone when atexit runs, so that path reports on stderr
+                if from_atexit: print(f"Warning: Issue closing data file: {e}", file=sys.stderr)
+                else: self.log(f"Warning: Issue closing data file: {e}")
+            finally:
+                self.data_file = None
+
     def _scan_for_visa_instruments(self):
         if not pyvisa: self.log("ERROR: PyVISA is not installed."); return
         try:
@@ -614,9 +853,11 @@ class Integrated_RT_GUI:
     def _on_closing(self):
         if self.is_running or self.is_stabilizing:
             if messagebox.askyesno("Exit", "Measurement running. Stop and exit?"):
+                # The window is destroyed by _finish_stop once the instruments are closed
+                self.exit_after_stop = True
                 self.stop_measurement(from_user=False)
-                self.root.destroy()
         else:
+            self._close_data_file()
             self.root.destroy()
 
 def main():
@@ -13,7 +13,11 @@
 import tkinter as tk
 from tkinter import ttk, Label, Entry, LabelFrame, Button, filedialog, messagebox, scrolledtext, Canvas
 import threading, queue
+import numpy as np
 import os
+import re
+import sys
+import math
 import time
 import traceback
 from datetime import datetime
@@ -25,6 +29,17 @@ import matplotlib as mpl
 import runpy
 from multiprocessing import Process
 
+try:
+    # Make the shared Keithley_6517B helpers importable when run as a standalone script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    k6517b_dir = os.path.abspath(os.path.join(script_dir, os.pardir))
+    if k6517b_dir not in sys.path:
+        sys.path.append(k6517b_dir)
+except Exception:
+    pass # Path manipulation can fail in some environments (e.g., frozen executables)
+
+from K6517B_Reading import parse_keithley_reading
+
 # --- Pillow for Logo Image ---
 try:
     from PIL import Image, ImageTk
@@ -44,6 +59,10 @@ except ImportError:
     VisaIOError = None
     PYMEASURE_AVAILABLE = False
 
+# Decoded and resized logo, kept for the lifetime of the process so that
+# reopening the GUI does not repeat the JPEG decode and resample.
+_LOGO_CACHE = None
+
 
 def run_script_process(script_path):
     """
@@ -93,6 +112,11 @@ class Lakeshore350_Backend:
         self.instrument = None
         rm = pyvisa.ResourceManager()
         self.instrument = rm.open_resource(visa_address, timeout=10000)
+        # Explicit termination so each read returns on the first CR/LF instead
+        # of waiting on the timeout; the 350 replies are short, so no query delay.
+        self.instrument.read_termination = '\r\n'
+        self.instrument.write_termination = '\n'
+        self.instrument.query_delay = 0.0
         print(f"Lakeshore Connected: {self.instrument.query('*IDN?').strip()}")
 
     def reset_and_clear(self):
@@ -106,10 +130,10 @@ class Lakeshore350_Backend:
         self.instrument.write(f'RANGE {output},{range_code}')
 
     def get_temperature(self, sensor):
-        return float(self.instrument.query(f'KRDG? {sensor}').strip())
+        return self.instrument.query_ascii_values(f'KRDG? {sensor}', converter='f')[0]
 
     def get_heater_output(self, output):
-        return float(self.instrument.query(f'HTR? {output}').strip())
+        return self.instrument.query_ascii_values(f'HTR? {output}', converter='f')[0]
 
     def close(self):
         if self.instrument:
@@ -127,7 +151,9 @@ class Combined_Backend:
     def __init__(self):
         self.lakeshore = None
         self.keithley = None
+        self._keithley_query = None
         self.params = {}
+        self.source_voltage = 0.0
 
     def initialize_instruments(self, parameters):
         self.params = parameters
@@ -142,9 +168,15 @@ class Combined_Backend:
         print(f"Keithley Connected: {self.keithley.id}")
         self._perform_keithley_zero_check()
 
-        self.keithley.source_voltage = self.params['source_voltage']
+        # Cache the commanded source voltage; it is constant for the whole run.
+        self.source_voltage = self.params['source_voltage']
+        self.keithley.source_voltage = self.source_voltage
         self.keithley.current_nplc = 1
         self.keithley.enable_source()
+        # The instrument is already configured for resistance, so the hot loop
+        # only needs ':READ?'. Query the VISA session directly rather than going
+        # through the PyMeasure property on every sample.
+        self._keithley_query = self.keithley.adapter.connection.query
         print(f"Keithley source enabled: {self.params['source_voltage']} V")
 
     def _perform_keithley_zero_check(self):
@@ -169,9 +201,10 @@ class Combined_Backend:
         time.sleep(self.params['delay'])
         current_temp = self.lakeshore.get_temperature('A')
         heater_output = self.lakeshore.get_heater_output(1) # Will always be 0
-        resistance = self.keithley.resistance
-        if resistance != 0 and resistance != float('inf') and resistance == resistance:
-            current = self.params['source_voltage'] / resistance
+        resistance = parse_keithley_reading(self._keithley_query(':READ?'))
+        # isfinite() rejects both inf and NaN in a single check.
+        if math.isfinite(resistance) and resistance != 0.0:
+            current = self.source_voltage / resistance
         else:
             current = 0.0
         return current_temp, heater_output, current, resistance
@@ -216,6 +249,10 @@ class Integrated_RT_GUI:
     FONT_TITLE = ('Segoe UI', FONT_SIZE_BASE + 2, 'bold')
     FONT_INPUT = ('Segoe UI', FONT_SIZE_BASE - 1) # Smaller font for inputs
     FONT_CONSOLE = ('Consolas', 10)
+    # Default GPIB addresses used to pre-select instruments after a scan
+    LAKESHORE_ADDR_RE = re.compile(r'GPIB\d*::(12|15)::')
+    KEITHLEY_ADDR_RE = re.compile(r'GPIB\d*::(26|27)::')
+    DATA_CAPACITY = 4096 # Initial size of the plot buffers; doubled when full
 
     def __init__(self, root):
         self.root = root
@@ -228,16 +265,23 @@ class Integrated_RT_GUI:
         self.start_time = None
         self.backend = Combined_Backend()
         self.file_location_path = ""
-        self.data_storage = {'time': [], 'temperature': [], 'current': [], 'resistance': []}
+        # Preallocated float64 buffers; only the first `data_count` entries are valid.
+        self.data_storage = {key: np.empty(self.DATA_CAPACITY) for key in ('time', 'temperature', 'current', 'resistance')}
+        self.data_count = 0
         self.log_scale_var = tk.BooleanVar(value=True)
         self.logo_image = None # Attribute to hold the logo image reference
         self.data_queue = queue.Queue()
+        self.visa_queue = queue.Queue()
         self.measurement_thread = None
         self.plot_backgrounds = None # For blitting
+        self._hidden = False # True while the main window is iconified
 
         self.setup_styles()
         self.create_widgets()
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+        # Skip all plotting while minimised; logging to file carries on.
+        self.root.bind('<Unmap>', self._on_root_unmap)
+        self.root.bind('<Map>', self._on_root_map)
 
     def setup_styles(self):
         style = ttk.Style(self.root)
@@ -324,10 +368,13 @@ class Integrated_RT_GUI:
 
         if PIL_AVAILABLE and os.path.exists(self.LOGO_FILE_PATH):
             try:
-                img = Image.open(self.LOGO_FILE_PATH)
-                img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.LANCZOS)
+                global _LOGO_CACHE
+                if _LOGO_CACHE is None:
+                    img = Image.open(self.LOGO_FILE_PATH)
+                    img.thumbnail((self.LOGO_SIZE, self.LOGO_SIZE), Image.Resampling.BILINEAR)
+                    _LOGO_CACHE = img.copy()
                 # IMPORTANT: Keep a reference to the image to prevent it from being garbage collected
-                self.logo_image = ImageTk.PhotoImage(img)
+                self.logo_image = ImageTk.PhotoImage(_LOGO_CACHE)
                 logo_canvas.create_image(self.LOGO_SIZE/2, self.LOGO_SIZE/2, image=self.logo_image)
             except Exception as e:
                 self.log(f"ERROR: Failed to load logo. {e}")
@@ -413,17 +460,19 @@ class Integrated_RT_GUI:
         self.ax_main = self.figure.add_subplot(gs[0, :])
         self.ax_sub1 = self.figure.add_subplot(gs[1, 0], sharex=self.ax_main) # Share X-axis with main plot
         self.ax_sub2 = self.figure.add_subplot(gs[1, 1]) # Temp vs Time has its own X-axis
-        self.line_main, = self.ax_main.plot([], [], color=self.CLR_ACCENT_RED, marker='o', markersize=3, linestyle='-', animated=True)
+        # Live lines are drawn without markers or anti-aliasing: for long runs the
+        # per-point marker rasterisation dominates the Agg draw time.
+        self.line_main, = self.ax_main.plot([], [], color=self.CLR_ACCENT_RED, marker='None', linestyle='-', linewidth=1.0, antialiased=False, animated=True)
         self.ax_main.set_title("Resistance vs. Temperature", fontweight='bold')
         self.ax_main.set_ylabel("Resistance (Ω)")
         if self.log_scale_var.get(): self.ax_main.set_yscale('log')
         else: self.ax_main.set_yscale('linear')
         self.ax_main.grid(True, which="both", linestyle='--', alpha=0.6)
-        self.line_sub1, = self.ax_sub1.plot([], [], color=self.CLR_ACCENT_GOLD, marker='.', markersize=3, linestyle='-', animated=True)
+        self.line_sub1, = self.ax_sub1.plot([], [], color=self.CLR_ACCENT_GOLD, marker='None', linestyle='-', linewidth=1.0, antialiased=False, animated=True)
         self.ax_sub1.set_xlabel("Temperature (K)")
         self.ax_sub1.set_ylabel("Current (A)")
         self.ax_sub1.grid(True, linestyle='--', alpha=0.6)
-        self.line_sub2, = self.ax_sub2.plot([], [], color=self.CLR_ACCENT_GREEN, marker='.', markersize=3, linestyle='-', animated=True)
+        self.line_sub2, = self.ax_sub2.plot([], [], color=self.CLR_ACCENT_GREEN, marker='None', linestyle='-', linewidth=1.0, antialiased=False, animated=True)
         self.ax_sub2.set_xlabel("Time (s)")
         self.ax_sub2.set_ylabel("Temperature (K)")
         self.ax_sub2.grid(True, linestyle='--', alpha=0.6)
@@ -475,7 +524,7 @@ class Integrated_RT_GUI:
             # --- START LOGGING DIRECTLY ---
             self.is_running = True
             self.start_button.config(state='disabled'); self.stop_button.config(state='normal')
-            for key in self.data_storage: self.data_storage[key].clear()
+            self.data_count = 0
             for line in [self.line_main, self.line_sub1, self.line_sub2]: line.set_data([], [])
             self.ax_main.set_title(f"R-T Curve: {params['sample_name']}", fontweight='bold')
             
@@ -486,7 +535,8 @@ class Integrated_RT_GUI:
             self.log("Blitting enabled for fast graph updates.")
 
             self.log("Starting passive data logging...")
-            self.start_time = time.time()
+            # Monotonic clock so elapsed time is immune to NTP/wall-clock jumps
+            self.start_time = time.monotonic()
             
             self.measurement_thread = threading.Thread(target=self._measurement_worker, daemon=True)
             self.measurement_thread.start()
@@ -514,8 +564,9 @@ class Integrated_RT_GUI:
         while self.is_running:
             try:
                 temp, htr, cur, res = self.backend.get_measurement()
-                elapsed = time.time() - self.start_time
-                self.data_queue.put((temp, htr, cur, res, elapsed))
+                now = time.time()
+                elapsed = time.monotonic() - self.start_time
+                self.data_queue.put((temp, htr, cur, res, elapsed, now))
             except Exception as e:
                 self.data_queue.put(e)
                 break
@@ -529,34 +580,20 @@ class Integrated_RT_GUI:
                     self.log(f"RUNTIME ERROR: {traceback.format_exc()}"); self.stop_measurement(False)
                     messagebox.showerror("Runtime Error", f"A critical error occurred: {data}"); return
                 
-                temp, htr, cur, res, elapsed = data
+                temp, htr, cur, res, elapsed, now = data
                 self.log(f"T:{temp:.3f}K | R:{res:.3e}Ω | I:{cur:.3e}A")
                 with open(self.data_filepath, 'a', newline='') as f:
                     writer = csv.writer(f)
-                    writer.writerow([datetime.now().strftime('%Y-%m-%d %H:%M:%S'), f"{elapsed:.2f}", f"{temp:.4f}", f"{htr:.2f}", f"{self.backend.params['source_voltage']:.4e}", f"{cur:.4e}", f"{res:.4e}"])
-
-                self.data_storage['time'].append(elapsed); self.data_storage['temperature'].append(temp)
-                self.data_storage['current'].append(cur); self.data_storage['resistance'].append(res)
-
-                # --- MODIFIED: Use blitting for fast graph updates ---
-                if self.plot_backgrounds:
-                    # Restore the clean backgrounds
-                    for bg in self.plot_backgrounds: self.canvas.restore_region(bg)
-                    
-                    # Update data for all lines
-                    self.line_main.set_data(self.data_storage['temperature'], self.data_storage['resistance'])
-                    self.line_sub1.set_data(self.data_storage['temperature'], self.data_storage['current'])
-                    self.line_sub2.set_data(self.data_storage['time'], self.data_storage['temperature'])
-                    
-                    # Redraw only the artists and blit the changes
-                    for ax, line in zip([self.ax_main, self.ax_sub1, self.ax_sub2], [self.line_main, self.line_sub1, self.line_sub2]):
-                        ax.relim(); ax.autoscale_view()
-                        ax.draw_artist(line)
-                    
-                    self.canvas.blit(self.figure.bbox)
-                else: # Fallback to full redraw if blitting isn't ready
-                    for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]: ax.relim(); ax.autoscale_view()
-                    self.figure.tight_layout(pad=3.0); self.canvas.draw_idle()
+                    writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)), f"{elapsed:.2f}", f"{temp:.4f}", f"{htr:.2f}", f"{self.backend.source_voltage:.4e}", f"{cur:.4e}", f"{res:.4e}"])
+
+                n = self.data_count
+                if n == len(self.data_storage['time']): self._grow_data_storage()
+                ds = self.data_storage
+                ds['time'][n] = elapsed; ds['temperature'][n] = temp
+                ds['current'][n] = cur; ds['resistance'][n] = res
+                n += 1
+                self.data_count = n
+                if not self._hidden: self._refresh_plots()
 
         except queue.Empty:
             pass
@@ -564,23 +601,94 @@ class Integrated_RT_GUI:
         if self.is_running:
             self.root.after(200, self._process_data_queue)
 
+    def _refresh_plots(self):
+        """Pushes the recorded data to the three live lines and redraws them."""
+        n, ds = self.data_count, self.data_storage
+        # Contiguous float64 views, handed to Matplotlib without conversion
+        t_view, temp_view = ds['time'][:n], ds['temperature'][:n]
+
+        # --- MODIFIED: Use blitting for fast graph updates ---
+        if self.plot_backgrounds:
+            # Restore the clean backgrounds
+            for bg in self.plot_backgrounds: self.canvas.restore_region(bg)
+            
+            # Update data for all lines
+            self.line_main.set_xdata(temp_view); self.line_main.set_ydata(ds['resistance'][:n])
+            self.line_sub1.set_xdata(temp_view); self.line_sub1.set_ydata(ds['current'][:n])
+            self.line_sub2.set_xdata(t_view); self.line_sub2.set_ydata(temp_view)
+            
+            # Redraw only the artists and blit the changes
+            for ax, line in zip([self.ax_main, self.ax_sub1, self.ax_sub2], [self.line_main, self.line_sub1, self.line_sub2]):
+                ax.relim(); ax.autoscale_view()
+                ax.draw_artist(line)
+            
+            self.canvas.blit(self.figure.bbox)
+            # Flush the pending repaint now. update_idletasks() does not
+            # process input events, so this callback cannot be re-entered.
+            self.canvas.get_tk_widget().update_idletasks()
+        else: # Fallback to full redraw if blitting isn't ready
+            for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]: ax.relim(); ax.autoscale_view()
+            self.figure.tight_layout(pad=3.0); self.canvas.draw_idle()
+
+    def _on_root_unmap(self, event):
+        if event.widget is self.root: self._hidden = True
+
+    def _on_root_map(self, event):
+        if event.widget is not self.root or not self._hidden: return
+        self._hidden = False
+        # Catch up with everything logged while the window was minimised
+        if self.plot_backgrounds:
+            self.canvas.draw() # Animated lines are skipped, leaving a clean background
+            self.plot_backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in [self.ax_main, self.ax_sub1, self.ax_sub2]]
+            self._refresh_plots()
+        else: self.canvas.draw_idle()
+
+    def _grow_data_storage(self):
+        """Doubles the capacity of the plot buffers, keeping the recorded data."""
+        for key, arr in self.data_storage.items():
+            grown = np.empty(2 * len(arr))
+            grown[:self.data_count] = arr[:self.data_count]
+            self.data_storage[key] = grown
+
     def _scan_for_visa_instruments(self):
+        """Starts the VISA scan in a separate thread to keep the GUI responsive."""
         if not pyvisa: self.log("ERROR: PyVISA is not installed."); return
+        # The button stays disabled until the scan returns, so repeated clicks
+        # cannot queue up several slow enumerations.
+        self.scan_button.config(state='disabled')
+        self.log("Scanning for VISA instruments...")
+        threading.Thread(target=self._visa_scan_worker, daemon=True).start()
+        self.root.after(100, self._process_visa_queue)
+
+    def _visa_scan_worker(self):
+        """Worker function that performs the slow VISA scan."""
         try:
             rm = pyvisa.ResourceManager()
-            self.log("Scanning for VISA instruments...")
-            resources = rm.list_resources()
-            if resources:
-                self.log(f"Found: {resources}")
-                self.lakeshore_cb['values'] = resources
-                self.keithley_cb['values'] = resources
-                for res in resources:
-                    if "GPIB1::15" in res: self.lakeshore_cb.set(res)
-                    if "GPIB1::27" in res: self.keithley_cb.set(res)
-            else:
-                self.log("No VISA instruments found.")
+            self.visa_queue.put(rm.list_resources())
         except Exception as e:
-            self.log(f"ERROR during VISA scan: {e}")
+            self.visa_queue.put(e)
+
+    def _process_visa_queue(self):
+        """Checks the queue for results from the VISA scan worker."""
+        try:
+            result = self.visa_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._process_visa_queue)
+            return
+
+        if isinstance(result, Exception):
+            self.log(f"ERROR during VISA scan: {result}")
+        elif result:
+            self.log(f"Found: {result}")
+            self.lakeshore_cb['values'] = result
+            self.keithley_cb['values'] = result
+            lakeshore_hit = next((r for r in result if self.LAKESHORE_ADDR_RE.search(r)), None)
+            keithley_hit = next((r for r in result if self.KEITHLEY_ADDR_RE.search(r)), None)
+            if lakeshore_hit: self.lakeshore_cb.set(lakeshore_hit)
+            if keithley_hit: self.keithley_cb.set(keithley_hit)
+        else:
+            self.log("No VISA instruments found.")
+        self.scan_button.config(state='normal')
 
     def _browse_file_location(self):
         path = filedialog.askdirectory()
@@ -0,0 +1,29 @@
+'''
+===============================================================================
+ PROGRAM:      Keithley 6517B Reading Parser
+
+ PURPOSE:      Shared helper for decoding 6517B ':READ?' responses.
+
+ DESCRIPTION:  Imported by the High Resistance frontends and backends so that
+               every script parses the electrometer's ASCII readings the same
+               way.
+
+ AUTHOR:       Prathamesh Deshmukh
+ GUIDED BY:    Dr. Sudip Mukherjee
+ INSTITUTE:    UGC-DAE Consortium for Scientific Research, Mumbai Centre
+===============================================================================
+'''
+import re
+
+# The 6517B appends unit suffixes (e.g. 'NADC', 'OHM') to its ASCII readings.
+_READING_RE = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+class KeithleyReadError(ValueError):
+    """Raised when a 6517B reading cannot be decoded (malformed or empty reply)."""
+
+def parse_keithley_reading(raw):
+    """Returns the first numeric element of a 6517B ':READ?' response."""
+    match = _READING_RE.match(raw)
+    if match is None:
+        raise KeithleyReadError(f"Unexpected Keithley reading: {raw!r}")
+    return float(match.group(1))
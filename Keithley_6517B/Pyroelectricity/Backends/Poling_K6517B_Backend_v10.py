@@ -9,45 +9,55 @@
 # updates: V1.3
 #-------------------------------------------------------------------------------
 
+import threading
 import time
 from pymeasure.instruments.keithley import Keithley6517B
 
-
-try:
-    keithley = Keithley6517B( "GPIB0::27::INSTR")
-    time.sleep(0.5)
-    #keithley.apply_voltage() # Sets up to source current
-    #keithley.source_voltage_range = 20 # Sets the source voltage
-    # range to 200 V
-    #keithley.source_voltage = 20 # Sets the source voltage to 20 V
-    time.sleep(0.5)
-     #keithley.enable_source() # Enables the source output
-    time.sleep(0.5)
-    keithley.source_voltage = 100
-    #keithley.measure_resistance() # Sets up to measure resistance
-    #keithley.ramp_to_voltage(10) # Ramps the voltage to 50 V
-    #print(keithley.resistance) # Prints the resistance in Ohms
-    time.sleep(20)
-    print(f'Current is {(keithley.current)}')
-
-
-    # and disables outpu
-except Exception as e:
-    print(f"error with Keithley6517B  : {e}")
-
-except KeyboardInterrupt:
-    #keithley.source_voltage = 0 # Ramps the voltage to 50 V
-    keithley.shutdown() # Ramps the voltage to 0 V
-    print("\n Poling stopped...")
-
-    time.sleep(0.5)
-    keithley.clear()
-    time.sleep(0.5)
-    keithley.reset()
-
-    keithley.shutdown()  # Ramps the current to 0 mA and disables output
-
-
-except Exception as e:
-    print(f"error with keithley : {e}")
-    keithley.shutdown()
+KEITHLEY_VISA = "GPIB0::27::INSTR"
+POLING_VOLTAGE = 100 # V
+POLING_TIME = 20 # s, hold before the current is read
+
+
+def run(stop_event=None):
+    """
+    Sets the poling voltage, holds it for POLING_TIME and prints the current.
+    A completed hold leaves the source on, as poling is meant to continue.
+    Setting `stop_event` (or Ctrl+C) ends the hold early; that and any error
+    shut the instrument down.
+    """
+    stop_event = stop_event or threading.Event()
+    keithley = None # Stays None if the connection itself fails
+    completed = False # Only a full, uninterrupted hold keeps the source on
+    try:
+        keithley = Keithley6517B(KEITHLEY_VISA)
+        #keithley.apply_voltage() # Sets up to source current
+        #keithley.source_voltage_range = 20 # Sets the source voltage
+        # range to 200 V
+        #keithley.enable_source() # Enables the source output
+        keithley.source_voltage = POLING_VOLTAGE
+        #keithley.measure_resistance() # Sets up to measure resistance
+        #keithley.ramp_to_voltage(10) # Ramps the voltage to 50 V
+
+        # Short sleeps keep the hold abortable (Ctrl+C or stop_event) at any point
+        deadline = time.monotonic() + POLING_TIME
+        while time.monotonic() < deadline and not stop_event.is_set():
+            time.sleep(0.1)
+        print(f'Current is {(keithley.current)}')
+        completed = not stop_event.is_set()
+
+    except KeyboardInterrupt:
+        print("\n Poling stopped...")
+
+    except Exception as e:
+        print(f"error with Keithley6517B  : {e}")
+
+    finally:
+        if keithley is not None and not completed:
+            try:
+                keithley.shutdown() # Ramps the voltage to 0 V and disables output
+            except Exception as e:
+                print(f"error with keithley : {e}")
+
+
+if __name__ == '__main__':
+    run()
@@ -1,6 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+import io
 import os
 import tkinter
 from tkinter import filedialog
@@ -36,15 +37,42 @@ selected_file = str(select_file())
 print(f"Selected file: {selected_file}")
 
 # Load data from CSV file
-
+# Parsed rows so far and the byte offset just past the last complete line read,
+# so each frame only parses what the measurement has appended since.
+state = {"df": None, "offset": 0}
+
+def read_new_rows():
+    """Appends any complete lines added to the file since the last call. Returns True if there were any."""
+    size = os.path.getsize(selected_file)
+    if size < state['offset']: # File was truncated or replaced; start over
+        state['df'], state['offset'] = None, 0
+    if size == state['offset']:
+        return False
+    with open(selected_file, 'rb') as f:
+        f.seek(state['offset'])
+        chunk = f.read(size - state['offset'])
+    # Leave a half-written last line for the next frame
+    end = chunk.rfind(b'\n') + 1
+    if end == 0:
+        return False
+    if state['df'] is None:
+        new = pd.read_csv(io.BytesIO(chunk[:end]))
+        state['df'] = new
+    else:
+        new = pd.read_csv(io.BytesIO(chunk[:end]), header=None, names=state['df'].columns)
+        state['df'] = pd.concat([state['df'], new], ignore_index=True)
+    state['offset'] += end
+    return not new.empty
 
 # Set up the plot
 plt.style.use('fivethirtyeight')
 fig, axs = plt.subplots(3, 1, figsize=(9, 12))
 
 def animate(i):
-    # Reload data from CSV (in case it has changed)
-    data = pd.read_csv(selected_file)
+    # Read only the rows appended since the last frame; nothing new, nothing to redraw
+    if not read_new_rows():
+        return
+    data = state['df']
     x = data['Time (s)']
     y1 = data['Temperature (K)']
     y2 = data['Current (A)']
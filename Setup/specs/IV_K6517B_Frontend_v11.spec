@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['F:\\GitHub\\PICA-Python-Instrument-Control-and-Automation\\Keithley_6517B/High_Resistance/IV_K6517B_Frontend_v11.py'],
-    pathex=[],
+    pathex=['F:\\GitHub\\PICA-Python-Instrument-Control-and-Automation\\Keithley_6517B'],
     binaries=[],
     datas=[],
     hiddenimports=[],
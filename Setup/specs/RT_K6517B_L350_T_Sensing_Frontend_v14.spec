@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['F:\\GitHub\\PICA-Python-Instrument-Control-and-Automation\\Keithley_6517B/High_Resistance/RT_K6517B_L350_T_Sensing_Frontend_v14.py'],
-    pathex=[],
+    pathex=['F:\\GitHub\\PICA-Python-Instrument-Control-and-Automation\\Keithley_6517B'],
     binaries=[],
     datas=[],
     hiddenimports=[],